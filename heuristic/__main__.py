@@ -1,26 +1,199 @@
-import sys
+import argparse
+import os
+from typing import Optional
 
-from alns import ALNS
 from numpy.random import default_rng
 
-from .classes import Problem
-from .destroy_operators import D_OPERATORS
-from .repair_operators import R_OPERATORS
+from .batched import MODES, solve_batched
+from .checkpoint import Checkpointer, resume
+from .classes import EvaluationCache, Problem, Solution
+from .constants import (CHECKPOINT_INTERVAL, DECAY, EXCHANGE_INTERVAL,
+                        ITERATIONS, SEGMENT_LENGTH)
+from .parallel import solve_parallel
+from .profiling import Profiler
+from .solve import Incumbent, initial_solution, solve
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="heuristic")
+
+    parser.add_argument("location", help="instance file location.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of parallel searches, or of processes "
+                             "generating candidates with --batch-size.")
+    parser.add_argument("--iterations", type=int,
+                        help="number of ALNS iterations, per search; "
+                             f"defaults to {ITERATIONS} when no other "
+                             "budget is given.")
+    parser.add_argument("--max-runtime", type=float,
+                        help="runtime budget, in seconds.")
+    parser.add_argument("--max-stagnation", type=int,
+                        help="number of iterations without a new best "
+                             "solution, after which the search stops.")
+    parser.add_argument("--segment-length", type=int,
+                        default=SEGMENT_LENGTH,
+                        help="iterations between operator weight updates.")
+    parser.add_argument("--decay", type=float, default=DECAY,
+                        help="operator weight decay, in [0, 1].")
+    parser.add_argument("--weights-log",
+                        help="location of a JSON lines log of the operator "
+                             "weights after each segment; single searches "
+                             "only.")
+    parser.add_argument("--stream", action="store_true",
+                        help="print each new best solution as it is found.")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="number of candidates generated in parallel per "
+                             "iteration; deterministic for a given seed, "
+                             "regardless of --workers.")
+    parser.add_argument("--batch-mode", choices=MODES, default="best",
+                        help="hand only the best candidate of each batch to "
+                             "the acceptance criterion, or all of them.")
+    parser.add_argument("--exchange-interval", type=int,
+                        default=EXCHANGE_INTERVAL,
+                        help="iterations between incumbent exchanges, when "
+                             "running parallel searches.")
+    parser.add_argument("--seed", type=int,
+                        help="random seed; defaults to the instance index.")
+    parser.add_argument("--checkpoint",
+                        help="location of a binary checkpoint of the best "
+                             "solution, written in the background; the "
+                             "search resumes from it when it exists.")
+    parser.add_argument("--checkpoint-interval", type=float,
+                        default=CHECKPOINT_INTERVAL,
+                        help="seconds between checkpoints, at most.")
+    parser.add_argument("--profile", action="store_true",
+                        help="print a profile of the search when done; "
+                             "single searches only.")
+    parser.add_argument("--trace",
+                        help="location of a JSON lines trace of each "
+                             "iteration; implies --profile.")
+
+    args = parser.parse_args()
+
+    if args.workers > 1 or args.batch_size > 1:
+        for flag, value in [("--profile", args.profile),
+                            ("--trace", args.trace),
+                            ("--weights-log", args.weights_log)]:
+            if value:
+                parser.error(f"{flag} is only supported for single searches, "
+                             "not with --workers or --batch-size.")
+
+    return args
+
+
+def print_incumbent(incumbent: Incumbent):
+    print(f"[{incumbent.runtime:.2f}s] New best: "
+          f"{incumbent.objective:.2f}, "
+          f"{len(incumbent.solution.unassigned)} unassigned customers.",
+          flush=True)
+
+
+def resume_checkpoint(location: Optional[str]) -> Optional[Solution]:
+    initial = resume(location)
+
+    if initial is not None:
+        print(f"Resuming from {location}: objective "
+              f"{initial.objective():.2f}.")
+
+    return initial
 
 
 def main():
-    if len(sys.argv) < 2:
-        raise ValueError(f"{sys.argv[0]}: expected file location.")
+    args = parse_args()
+    callbacks = [print_incumbent] if args.stream else []
+
+    checkpointer = Checkpointer(args.checkpoint, args.checkpoint_interval) \
+        if args.checkpoint else None
+
+    if checkpointer is not None:
+        callbacks.append(checkpointer)
+
+    def on_best(incumbent: Incumbent):
+        for callback in callbacks:
+            callback(incumbent)
+
+    try:
+        best = run(args, on_best if callbacks else None)
+    finally:
+        if checkpointer is not None:
+            checkpointer.close()
+
+    print(f"Objective: {best.objective():.2f}, "
+          f"{len(best.routes)} routes, "
+          f"{len(best.unassigned)} unassigned customers.")
+
+
+def run(args, on_best) -> Solution:
+    if args.workers > 1 and args.batch_size == 1:
+        return run_parallel(args, on_best)
+
+    problem = Problem.from_file(args.location)
+    seed = problem.instance if args.seed is None else args.seed
+
+    initial = resume_checkpoint(args.checkpoint)
+
+    if args.batch_size > 1:
+        if initial is None:
+            initial = initial_solution(default_rng(seed))
+
+        result = solve_batched(initial, seed, args.batch_size, args.workers,
+                               args.batch_mode, args.iterations,
+                               args.max_runtime, args.max_stagnation, on_best,
+                               args.segment_length, args.decay)
+
+        return result.best_state
+
+    rnd_state = default_rng(seed)
+
+    if initial is None:
+        initial = initial_solution(rnd_state)
+
+    profiler = Profiler()
+
+    if args.profile or args.trace:
+        profiler.enable(args.trace)
+
+    weights_log = open(args.weights_log, 'w') if args.weights_log else None
+
+    try:
+        result = solve(initial, rnd_state, args.iterations, args.max_runtime,
+                       args.max_stagnation, on_best, args.segment_length,
+                       args.decay, weights_log)
+    finally:
+        if weights_log is not None:
+            weights_log.close()
+
+    if profiler.enabled:
+        profiler.disable()
+        print(profiler.summary())
+        print(EvaluationCache().summary())
+
+    return result.best_state
+
+
+def run_parallel(args, on_best) -> Solution:
+    initial = None
 
-    problem = Problem.from_file(sys.argv[1])
+    if args.checkpoint is not None and os.path.exists(args.checkpoint):
+        # The checkpoint is rebuilt for the problem, which solve_parallel
+        # then loads again.
+        Problem.from_file(args.location)
+        initial = resume_checkpoint(args.checkpoint)
 
-    alns = ALNS(default_rng(problem.instance))
+    best, stats = solve_parallel(args.location, args.workers, args.iterations,
+                                 args.exchange_interval, args.seed,
+                                 args.max_runtime, args.max_stagnation,
+                                 on_best, initial, args.segment_length,
+                                 args.decay)
 
-    for op in D_OPERATORS:
-        alns.add_destroy_operator(op)
+    for worker in stats:
+        print(f"Worker {worker['worker']}: "
+              f"best {worker['best_objective']:.2f}, "
+              f"{worker['iterations']} iterations in "
+              f"{worker['runtime']:.2f}s, "
+              f"{worker['improvements']} incumbent improvements.")
 
-    for op in R_OPERATORS:
-        alns.add_repair_operator(op)
+    return best
 
 
 if __name__ == "__main__":
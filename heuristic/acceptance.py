@@ -0,0 +1,96 @@
+import time
+from typing import Optional
+
+import numpy as np
+from alns.accept import SimulatedAnnealing
+
+from heuristic.constants import ITERATIONS
+
+
+class BudgetedAnnealing(SimulatedAnnealing):
+    """
+    Simulated annealing that cools down over the search budget, rather than
+    over a fixed number of steps. The progress through the budget is the
+    largest fraction spent of the iteration and runtime budgets, and the
+    temperature decays exponentially from the start to the end temperature
+    as the progress goes from zero to one. Under an iteration budget alone,
+    this is the schedule of ``SimulatedAnnealing.autofit``.
+
+    Only a stagnation budget gives no horizon; the temperature then decays
+    over ITERATIONS acceptance tests.
+
+    The progress may be carried over between runs on the same budget, as in
+    the epochs of a parallel search: see ``resume``.
+    """
+    _iterations: Optional[int]
+    _max_runtime: Optional[float]
+
+    _tests: int  # acceptance tests done, over all runs
+    _spent: float  # runtime spent before the current run, in seconds
+    _clock: float  # start of the current run
+
+    def __init__(self, start_temperature: float, end_temperature: float,
+                 iterations: Optional[int] = None,
+                 max_runtime: Optional[float] = None):
+        # The step is not used, since the temperature follows the progress.
+        super().__init__(start_temperature, end_temperature, 1.)
+
+        if iterations is None and max_runtime is None:
+            iterations = ITERATIONS
+
+        self._iterations = iterations
+        self._max_runtime = max_runtime
+
+        self._tests = 0
+        self.resume(0.)
+
+    @classmethod
+    def autofit(cls, init_obj: float, worse: float, accept_prob: float,
+                iterations: Optional[int] = None,
+                max_runtime: Optional[float] = None) -> "BudgetedAnnealing":
+        """
+        Returns an instance with a start temperature such that a solution up
+        to worse (a fraction) worse than the initial solution is accepted
+        with probability accept_prob, as in ``SimulatedAnnealing.autofit``.
+        The end temperature is one.
+        """
+        start_temperature = -worse * init_obj / np.log(accept_prob)
+        return cls(start_temperature, 1., iterations, max_runtime)
+
+    @property
+    def progress(self) -> float:
+        """
+        Fraction of the budget spent, in [0, 1].
+        """
+        progress = 0.
+
+        if self._iterations is not None:
+            progress = self._tests / max(self._iterations, 1)
+
+        if self._max_runtime is not None:
+            runtime = self._spent + time.perf_counter() - self._clock
+            progress = max(progress, runtime / self._max_runtime)
+
+        return min(progress, 1.)
+
+    def resume(self, spent: float):
+        """
+        Starts a run, after the passed-in runtime (in seconds) of the budget
+        was spent already.
+        """
+        self._spent = spent
+        self._clock = time.perf_counter()
+
+    def __call__(self, rng, best, current, candidate):
+        # Candidates that are not worse are always accepted. Capping the
+        # exponent at zero also avoids overflow when the candidate is much
+        # better, e.g. when it assigns a customer that was unassigned.
+        delta = current.objective() - candidate.objective()
+        probability = np.exp(min(delta, 0.) / self._temperature)
+
+        self._tests += 1
+
+        ratio = self.end_temperature / self.start_temperature
+        self._temperature = self.start_temperature * ratio ** self.progress
+
+        return probability >= rng.random()
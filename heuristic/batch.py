@@ -0,0 +1,174 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from numpy.random import default_rng
+
+from heuristic.classes import Problem
+from heuristic.classes.Problem import BINARY_EXTENSION
+from heuristic.solve import initial_solution, solve
+
+# Columns of the summary, in order.
+FIELDS = ["instance", "location", "customers", "objective", "routes",
+          "unassigned", "iterations", "runtime", "error"]
+
+
+def find_instances(patterns: List[str]) -> List[str]:
+    """
+    Returns the instance files matching the passed-in directories and glob
+    patterns, largest first. Directories match their data modules and
+    binary instance files. When an instance is available in both formats,
+    only the (faster loading) binary file is used.
+    """
+    locations = set()
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            locations.update(glob.glob(os.path.join(pattern, "*.py")))
+            locations.update(glob.glob(os.path.join(pattern,
+                                                    "*" + BINARY_EXTENSION)))
+        else:
+            locations.update(glob.glob(pattern))
+
+    binaries = {os.path.splitext(location)[0] for location in locations
+                if location.endswith(BINARY_EXTENSION)}
+
+    locations = [location for location in locations
+                 if location.endswith(BINARY_EXTENSION)
+                 or os.path.splitext(location)[0] not in binaries]
+
+    return sorted(locations, key=os.path.getsize, reverse=True)
+
+
+def solve_batch(locations: List[str], workers: int,
+                iterations: Optional[int] = None,
+                max_runtime: Optional[float] = None,
+                max_stagnation: Optional[int] = None,
+                seed: Optional[int] = None) -> List[Dict]:
+    """
+    Solves the instances at the passed-in locations in a pool of worker
+    processes, in the given order. Each instance is solved in a single
+    worker, with its own budget (see ``solve``), so the batch takes about as
+    long as its slowest instance, when there are enough workers.
+
+    Returns a summary of each instance, in the given order. Instances that
+    fail are reported with their error, rather than failing the batch.
+    """
+    results = {}
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(_solve_instance, location, iterations,
+                               max_runtime, max_stagnation, seed): location
+                   for location in locations}
+
+        for future in as_completed(futures):
+            location = futures[future]
+
+            try:
+                results[location] = future.result()
+            except Exception as error:
+                results[location] = dict.fromkeys(FIELDS)
+                results[location].update(location=location,
+                                         error=repr(error))
+
+            _report(results[location])
+
+    return [results[location] for location in locations]
+
+
+def _solve_instance(location: str, iterations: Optional[int],
+                    max_runtime: Optional[float],
+                    max_stagnation: Optional[int],
+                    seed: Optional[int]) -> Dict:
+    """
+    Solves a single instance in a worker, and returns its summary. The
+    Problem is a per-process singleton, so every worker solves one instance
+    at a time.
+    """
+    start = time.perf_counter()
+
+    problem = Problem.from_file(location)
+    rnd_state = default_rng(problem.instance if seed is None else seed)
+
+    result = solve(initial_solution(rnd_state), rnd_state, iterations,
+                   max_runtime, max_stagnation)
+    best = result.best_state
+
+    return dict(instance=problem.instance,
+                location=location,
+                customers=problem.cust_num,
+                objective=best.objective(),
+                routes=len(best.routes),
+                unassigned=len(best.unassigned),
+                iterations=len(result.statistics.objectives) - 1,
+                runtime=time.perf_counter() - start,
+                error=None)
+
+
+def _report(summary: Dict):
+    if summary.get("error") is not None:
+        print(f"{summary['location']}: failed, {summary['error']}.",
+              flush=True)
+    else:
+        print(f"{summary['location']}: objective "
+              f"{summary['objective']:.2f}, {summary['routes']} routes, "
+              f"{summary['unassigned']} unassigned customers, in "
+              f"{summary['runtime']:.2f}s.", flush=True)
+
+
+def write_summary(summaries: List[Dict], location: str):
+    """
+    Writes the summaries to the passed-in location, as JSON for locations
+    ending in .json, and as CSV otherwise.
+    """
+    with open(location, 'w', newline='') as file:
+        if location.endswith(".json"):
+            json.dump(summaries, file, indent=2)
+        else:
+            writer = csv.DictWriter(file, FIELDS)
+            writer.writeheader()
+            writer.writerows(summaries)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="heuristic.batch",
+        description="Solves a batch of instances in parallel, largest first, "
+                    "and writes a summary of the results.")
+
+    parser.add_argument("instances", nargs="+",
+                        help="instance directories, files or glob "
+                             "patterns.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of instances solved in parallel.")
+    parser.add_argument("--iterations", type=int,
+                        help="number of ALNS iterations, per instance.")
+    parser.add_argument("--max-runtime", type=float,
+                        help="runtime budget, in seconds, per instance.")
+    parser.add_argument("--max-stagnation", type=int,
+                        help="number of iterations without a new best "
+                             "solution, after which an instance stops.")
+    parser.add_argument("--seed", type=int,
+                        help="random seed; defaults to the instance index.")
+    parser.add_argument("--output", default="summary.csv",
+                        help="summary location; JSON if it ends in .json, "
+                             "CSV otherwise.")
+
+    args = parser.parse_args()
+    locations = find_instances(args.instances)
+
+    if not locations:
+        parser.error("no instance files found.")
+
+    summaries = solve_batch(locations, args.workers, args.iterations,
+                            args.max_runtime, args.max_stagnation, args.seed)
+    write_summary(summaries, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from alns import Result
+from alns.Outcome import Outcome
+from alns.Statistics import Statistics
+from alns.select import SegmentedRouletteWheel
+from numpy.random import SeedSequence, default_rng
+
+from heuristic.acceptance import BudgetedAnnealing
+from heuristic.classes import Problem, Solution
+from heuristic.constants import (ACCEPT_PROB, DECAY, SEGMENT_LENGTH, WEIGHTS,
+                                 WORSE)
+from heuristic.destroy_operators import D_OPERATORS
+from heuristic.parallel import _init_worker
+from heuristic.repair_operators import R_OPERATORS
+from heuristic.solve import Incumbent, stopping_criterion
+
+# Which candidates of each batch are handed to the acceptance criterion.
+MODES = ("best", "all")
+
+# Worker's copy of the current solution, which is kept between tasks for as
+# long as the current solution does not change.
+_current: Optional[Solution] = None
+
+
+class _Candidate:
+    """
+    Candidate solution as returned by a worker, in compact form. Acceptance
+    criteria only need its objective, so it is not rebuilt unless accepted.
+    """
+    __slots__ = ["compact", "d_idx", "r_idx", "_objective"]
+
+    def __init__(self, compact: Dict[str, np.ndarray], objective: float,
+                 d_idx: int, r_idx: int):
+        self.compact = compact
+        self.d_idx = d_idx
+        self.r_idx = r_idx
+        self._objective = objective
+
+    def objective(self) -> float:
+        return self._objective
+
+
+def solve_batched(initial: Solution, seed: int, batch_size: int,
+                  workers: int, mode: str = "best",
+                  iterations: Optional[int] = None,
+                  max_runtime: Optional[float] = None,
+                  max_stagnation: Optional[int] = None,
+                  on_best: Optional[Callable[[Incumbent], None]] = None,
+                  segment_length: int = SEGMENT_LENGTH,
+                  decay: float = DECAY) -> Result:
+    """
+    Runs the ALNS from the passed-in initial solution, generating a batch of
+    batch_size candidates in each iteration, from as many selected operator
+    pairs. The candidates are generated in parallel, in a pool of worker
+    processes that share the problem data through shared memory. In the
+    "best" mode, only the best candidate of each batch is handed to the
+    acceptance criterion; in the "all" mode, every candidate is, in order.
+
+    Each candidate is generated from its own random stream, derived from the
+    seed, the iteration and its index in the batch, and operators are
+    selected by the plain segmented roulette wheel, since wall times are not
+    reproducible. Under an iteration or stagnation budget, the search is thus
+    deterministic for a given seed, regardless of the number of workers.
+
+    Stops as ``solve`` does, and cools down over the budget as it does,
+    counting batches as iterations. Operator weights are updated every
+    segment_length iterations. The on_best callback is called as in
+    ``solve``.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode}; expected one of {MODES}.")
+
+    problem = Problem()
+
+    if workers <= 1:
+        return _iterate(map, initial, seed, batch_size, mode, iterations,
+                        max_runtime, max_stagnation, on_best, segment_length,
+                        decay)
+
+    descriptor = problem.to_shared_memory()
+
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(descriptor,)) as pool:
+            return _iterate(pool.map, initial, seed, batch_size, mode,
+                            iterations, max_runtime, max_stagnation, on_best,
+                            segment_length, decay)
+    finally:
+        problem.release_shared_memory()
+
+
+def _iterate(evaluate: Callable[..., Iterable], initial: Solution, seed: int,
+             batch_size: int, mode: str, iterations: Optional[int],
+             max_runtime: Optional[float], max_stagnation: Optional[int],
+             on_best: Optional[Callable[[Incumbent], None]],
+             segment_length: int, decay: float) -> Result:
+    """
+    Runs the batched search loop, mirroring ``ALNS.iterate``. The evaluate
+    argument maps ``_generate`` over the tasks of a batch, in order.
+    """
+    start = time.perf_counter()
+
+    def stream(solution: Solution):
+        if on_best is not None:
+            on_best(Incumbent(solution, solution.objective(),
+                              time.perf_counter() - start))
+
+    root = SeedSequence(seed)
+    rnd_state = default_rng(root)  # for selection and acceptance only
+
+    # Operators are selected batch_size times per iteration, so segments
+    # are scaled to span segment_length iterations.
+    select = SegmentedRouletteWheel(WEIGHTS, decay,
+                                    segment_length * batch_size,
+                                    len(D_OPERATORS), len(R_OPERATORS))
+
+    # Simulated annealing counts acceptance tests, of which there are
+    # batch_size per iteration in the "all" mode.
+    tests = iterations
+
+    if iterations is not None and mode == "all":
+        tests = iterations * batch_size
+
+    accept = BudgetedAnnealing.autofit(initial.objective(), WORSE,
+                                       ACCEPT_PROB, tests, max_runtime)
+    stop = stopping_criterion(iterations, max_runtime, max_stagnation)
+
+    curr = best = initial
+    compact = curr.to_compact()
+    stream(initial)
+
+    stats = Statistics()
+    stats.collect_objective(initial.objective())
+    stats.collect_runtime(time.perf_counter())
+
+    iteration = 0
+
+    while not stop(rnd_state, best, curr):
+        pairs = [select(rnd_state, best, curr) for _ in range(batch_size)]
+        seeds = [SeedSequence(root.entropy, spawn_key=(iteration, idx))
+                 for idx in range(batch_size)]
+
+        results = evaluate(_generate, [compact] * batch_size,
+                           [curr.fingerprint] * batch_size,
+                           *zip(*pairs), seeds)
+
+        candidates = [_Candidate(cand_compact, objective, d_idx, r_idx)
+                      for (cand_compact, objective), (d_idx, r_idx)
+                      in zip(results, pairs)]
+
+        # The first best candidate is shown on ties, so the choice does not
+        # depend on the order in which workers finish.
+        shown = range(batch_size) if mode == "all" \
+            else [min(range(batch_size), key=lambda idx:
+                      candidates[idx].objective())]
+
+        # Candidates that are not shown are scored as if rejected, unless
+        # these improve on the current solution.
+        outcomes = [Outcome.BETTER if cand.objective() < curr.objective()
+                    else Outcome.REJECT for cand in candidates]
+
+        for idx in shown:
+            cand = candidates[idx]
+            outcome = Outcome.REJECT
+
+            if accept(rnd_state, best, curr, cand):
+                outcome = Outcome.BETTER \
+                    if cand.objective() < curr.objective() else Outcome.ACCEPT
+
+            if cand.objective() < best.objective():
+                outcome = Outcome.BEST
+
+            if outcome != Outcome.REJECT:
+                curr = Solution.from_compact(cand.compact)
+                compact = cand.compact
+
+            if outcome == Outcome.BEST:
+                best = curr
+                stream(best)
+
+            outcomes[idx] = outcome
+
+        for cand, outcome in zip(candidates, outcomes):
+            select.update(cand, cand.d_idx, cand.r_idx, outcome)
+
+            stats.collect_destroy_operator(D_OPERATORS[cand.d_idx].__name__,
+                                           outcome)
+            stats.collect_repair_operator(R_OPERATORS[cand.r_idx].__name__,
+                                          outcome)
+
+        stats.collect_objective(curr.objective())
+        stats.collect_runtime(time.perf_counter())
+
+        iteration += 1
+
+    return Result(best, stats)
+
+
+def _generate(compact: Dict[str, np.ndarray], fingerprint: int, d_idx: int,
+              r_idx: int, seed: SeedSequence
+              ) -> Tuple[Dict[str, np.ndarray], float]:
+    """
+    Generates a candidate from the passed-in compact current solution, with
+    the given operators and random stream. Returns the candidate in compact
+    form, and its objective.
+
+    The current solution is only rebuilt when it changed, and is restored by
+    rolling back the candidate. Either way, it equals the rebuilt solution,
+    so candidates do not depend on the tasks a worker did before.
+    """
+    global _current
+
+    if _current is None or _current.fingerprint != fingerprint:
+        _current = Solution.from_compact(compact)
+
+    rnd_state = default_rng(seed)
+
+    candidate = D_OPERATORS[d_idx](_current, rnd_state)
+
+    try:
+        candidate = R_OPERATORS[r_idx](candidate, rnd_state)
+        return candidate.to_compact(), candidate.objective()
+    finally:
+        candidate.rollback()
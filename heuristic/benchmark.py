@@ -0,0 +1,132 @@
+import argparse
+import json
+import time
+from copy import deepcopy
+from typing import Callable, Dict, List, Optional
+
+from numpy.random import default_rng
+
+from heuristic.classes import Problem, Solution
+from heuristic.destroy_operators import D_OPERATORS, random_customers
+from heuristic.generate import generate
+from heuristic.repair_operators import R_OPERATORS
+from heuristic.solve import initial_solution, solve
+
+SIZES = [10, 100, 500, 1000]
+
+
+def benchmark(num_customers: int, seed: int, repeats: int,
+              iterations: int) -> Dict:
+    """
+    Benchmarks the hot paths on a generated instance of the given size.
+    Returns the mean time per call, in seconds, of Route insertion and
+    removal, Solution.objective and each registered operator, and the
+    number of ALNS iterations per second.
+    """
+    Problem.from_data(generate(num_customers, seed, num_types=1))
+    rnd_state = default_rng(seed)
+
+    start = time.perf_counter()
+    initial = initial_solution(rnd_state)
+    construction = time.perf_counter() - start
+
+    results = dict(customers=num_customers,
+                   routes=len(initial.routes),
+                   unassigned=len(initial.unassigned),
+                   initial_solution=construction)
+
+    # Removes and reinserts every customer of the longest route.
+    route = max(initial.routes, key=lambda route: len(route.customers))
+    route = deepcopy(route)
+    visits = list(enumerate(route.customers))[1:-1]
+
+    remove_time = insert_time = 0.
+
+    for at, customer in visits:
+        plan = route.plan[at]
+
+        start = time.perf_counter()
+        route.remove_customer(customer)
+        remove_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        route.insert_customer(customer, at, plan)
+        insert_time += time.perf_counter() - start
+
+    results["route_remove_customer"] = remove_time / max(len(visits), 1)
+    results["route_insert_customer"] = insert_time / max(len(visits), 1)
+
+    results["solution_objective"] = _time(initial.objective, 100 * repeats)
+
+    # Destroy operators are timed as in the search: on a current solution
+    # that is not frozen, with each candidate rolled back after timing.
+    current = initial.begin()
+    current.commit()
+
+    for op in D_OPERATORS:
+        results[op.__name__] = _time(lambda: op(current, rnd_state), repeats,
+                                     Solution.rollback)
+
+    for op in R_OPERATORS:
+        destroyed = [random_customers(initial, rnd_state)
+                     for _ in range(repeats)]
+        results[op.__name__] = _time(lambda: op(destroyed.pop(), rnd_state),
+                                     repeats)
+
+    start = time.perf_counter()
+    solve(initial, rnd_state, iterations)
+    results["iterations_per_second"] = iterations / (time.perf_counter()
+                                                     - start)
+
+    return results
+
+
+def _time(func: Callable, repeats: int,
+          teardown: Optional[Callable] = None) -> float:
+    """
+    Returns the mean time per call of func, in seconds. The optional
+    teardown is called with the result of each call, outside the timing.
+    """
+    total = 0.
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        total += time.perf_counter() - start
+
+        if teardown is not None:
+            teardown(result)
+
+    return total / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="heuristic.benchmark",
+        description="Times the hot paths on generated instances, and reports "
+                    "the results as JSON.")
+
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="instance sizes (number of customers).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=10,
+                        help="number of timed calls per operator.")
+    parser.add_argument("--iterations", type=int, default=100,
+                        help="number of timed ALNS iterations.")
+    parser.add_argument("--output", help="output location; default stdout.")
+
+    args = parser.parse_args()
+
+    results: List[Dict] = [benchmark(size, args.seed, args.repeats,
+                                     args.iterations)
+                           for size in args.sizes]
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import threading
+from typing import Optional
+
+from heuristic.classes import Solution
+from heuristic.constants import CHECKPOINT_INTERVAL
+from heuristic.solve import Incumbent
+
+
+class Checkpointer:
+    """
+    Writes the latest incumbent to a binary solution file (see
+    ``Solution.to_binary``), from a background thread, so the search is not
+    blocked by writing. Incumbents are passed in as the on_best callback of
+    ``solve``; these are never changed by the search, so are safe to read
+    from the thread. At most one checkpoint is written per interval, in
+    seconds, and the final incumbent is written on close.
+
+    Each checkpoint is first written to a temporary file, which then
+    replaces the previous checkpoint, so a checkpoint is never partially
+    written, even when the run is killed.
+    """
+    _location: str
+    _interval: float
+
+    _latest: Optional[Solution]
+    _lock: threading.Lock
+    _closed: threading.Event
+    _thread: threading.Thread
+
+    def __init__(self, location: str, interval: float = CHECKPOINT_INTERVAL):
+        self._location = location
+        self._interval = interval
+
+        self._latest = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, name="checkpointer",
+                                        daemon=True)
+        self._thread.start()
+
+    def __call__(self, incumbent: Incumbent):
+        with self._lock:
+            self._latest = incumbent.solution
+
+    def __enter__(self) -> "Checkpointer":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Writes the final incumbent, if not yet written, and stops the thread.
+        """
+        self._closed.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._closed.wait(self._interval):
+            self._write()
+
+        self._write()
+
+    def _write(self):
+        with self._lock:
+            solution, self._latest = self._latest, None
+
+        if solution is None:
+            return
+
+        temporary = self._location + ".tmp"
+
+        solution.to_binary(temporary)
+        os.replace(temporary, self._location)
+
+
+def resume(location: Optional[str]) -> Optional[Solution]:
+    """
+    Returns the solution in the checkpoint at the passed-in location, or None
+    when there is no such checkpoint.
+    """
+    if location is None or not os.path.exists(location):
+        return None
+
+    return Solution.from_binary(location)
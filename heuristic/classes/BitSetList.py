@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import Iterable, List
+
+import numpy as np
+
+
+class BitSetList:
+    _mask: np.ndarray
+    _items: np.ndarray
+    _size: int
+
+    def __init__(self, items: Iterable[int] = (), universe: int = 0):
+        """
+        BitSetList is a compact SetList, of integers in [0, universe). It
+        stores a membership mask over the universe, and the items in order of
+        insertion, in an index array. This supports O(1) look-ups, vectorised
+        bulk additions and removals, and copies that are a few memcpy's.
+
+        Note: as with SetList, this data structure must *not* be used for
+        data that may contain duplicates.
+        """
+        self._mask = np.zeros(universe, dtype=bool)
+        self._items = np.empty(universe, dtype=np.int64)
+        self._size = 0
+
+        self.extend(items)
+
+    def __contains__(self, item: int) -> bool:
+        return 0 <= item < len(self._mask) and bool(self._mask[item])
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        yield from self._items[:self._size].tolist()
+
+    def __getitem__(self, index: int) -> int:
+        return int(self._items[:self._size][index])
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self.to_array() if dtype is None \
+            else self.to_array().astype(dtype)
+
+    def __copy__(self) -> BitSetList:
+        other = BitSetList.__new__(BitSetList)
+
+        other._mask = self._mask.copy()
+        other._items = np.empty_like(self._items)
+        other._items[:self._size] = self._items[:self._size]
+        other._size = self._size
+
+        return other
+
+    def __deepcopy__(self, memodict={}) -> BitSetList:
+        return self.__copy__()
+
+    @property
+    def mask(self) -> np.ndarray:
+        """
+        Read-only view of the membership mask, over the whole universe.
+        """
+        view = self._mask.view()
+        view.flags.writeable = False
+        return view
+
+    def append(self, obj: int):
+        self._mask[obj] = True
+        self._items[self._size] = obj
+        self._size += 1
+
+    def extend(self, objs: Iterable[int]):
+        """
+        Appends the passed-in items, in order. Vectorised.
+        """
+        objs = np.fromiter(objs, dtype=np.int64) \
+            if not isinstance(objs, np.ndarray) else objs.astype(np.int64)
+
+        self._mask[objs] = True
+        self._items[self._size:self._size + len(objs)] = objs
+        self._size += len(objs)
+
+    def index(self, obj: int) -> int:
+        if obj not in self:
+            raise ValueError(f"{obj} is not in BitSetList.")
+
+        return int(np.flatnonzero(self._items[:self._size] == obj)[0])
+
+    def remove(self, obj: int):
+        index = self.index(obj)
+
+        self._items[index:self._size - 1] = self._items[index + 1:self._size]
+        self._size -= 1
+        self._mask[obj] = False
+
+    def difference_update(self, objs: Iterable[int]):
+        """
+        Removes the passed-in items, where present, keeping the order of the
+        remaining items. Vectorised.
+        """
+        objs = np.fromiter(objs, dtype=np.int64) \
+            if not isinstance(objs, np.ndarray) else objs.astype(np.int64)
+
+        self._mask[objs] = False
+
+        items = self._items[:self._size]
+        items = items[self._mask[items]]
+
+        self._items[:len(items)] = items
+        self._size = len(items)
+
+    def clear(self):
+        self._mask[self._items[:self._size]] = False
+        self._size = 0
+
+    def to_array(self) -> np.ndarray:
+        return self._items[:self._size].copy()
+
+    def to_list(self) -> List[int]:
+        return self._items[:self._size].tolist()
+
+    def __str__(self):
+        return str(self.to_list())
+
+    def __repr__(self):
+        return repr(self.to_list())
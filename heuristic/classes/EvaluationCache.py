@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+from heuristic.constants import EVALUATION_CACHE_SIZE
+from .Problem import Problem
+from .Singleton import Singleton
+
+_T = TypeVar("_T")
+
+
+class LRUCache(Generic[_T]):
+    """
+    Bounded cache, that evicts the least recently used entry when full.
+    Keeps track of its hit rate.
+    """
+    _entries: OrderedDict
+    _maxsize: int
+
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int):
+        self._entries = OrderedDict()
+        self._maxsize = maxsize
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def get(self, key: Hashable) -> Optional[_T]:
+        """
+        Returns the value cached for the passed-in key, or None when there is
+        no such value. O(1).
+        """
+        value = self._entries.get(key)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        return value
+
+    def put(self, key: Hashable, value: _T):
+        """
+        Caches the value for the passed-in key, evicting the least recently
+        used entry when the cache is full. O(1).
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class EvaluationCache(metaclass=Singleton):
+    """
+    Caches of route evaluations, keyed by route fingerprint (see
+    ``Route.fingerprint``): routing costs, and feasibility verdicts. The
+    search often revisits routes, for example after a rejected candidate is
+    rolled back, and these are then not evaluated again.
+
+    Fingerprints are 64-bit hashes, so distinct routes collide with
+    negligible probability. The caches are cleared when another problem
+    instance is loaded.
+    """
+    costs: LRUCache[float]
+    verdicts: LRUCache[bool]
+
+    _problem: Optional[Problem]
+
+    def __init__(self, maxsize: int = EVALUATION_CACHE_SIZE):
+        self.costs = LRUCache(maxsize)
+        self.verdicts = LRUCache(maxsize)
+
+        self._problem = None
+
+    def check_problem(self):
+        """
+        Clears the caches if the problem instance changed since they were
+        last used.
+        """
+        problem = Problem()
+
+        if problem is not self._problem:
+            self.costs.clear()
+            self.verdicts.clear()
+            self._problem = problem
+
+    def summary(self) -> str:
+        """
+        Returns a table of the size, hits, misses and hit rate of each cache.
+        """
+        lines = [f"{'':<28}{'size':>10}{'hits':>10}{'misses':>10}"
+                 f"{'hit rate':>10}"]
+
+        for label, cache in [("route costs", self.costs),
+                             ("route verdicts", self.verdicts)]:
+            lines.append(f"{label:<28}{len(cache):>10}{cache.hits:>10}"
+                         f"{cache.misses:>10}{cache.hit_rate:>10.1%}")
+
+        return "\n".join(lines)
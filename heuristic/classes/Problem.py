@@ -2,13 +2,19 @@ from __future__ import annotations
 
 from functools import lru_cache
 from itertools import product
-from typing import List
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import importlib.util
+import json
 
+from heuristic.constants import NUM_NEIGHBOURS
 from .Singleton import Singleton
 
+BINARY_MAGIC = b'ALNSINST'
+BINARY_EXTENSION = '.bin'
+
 class Problem(metaclass=Singleton):
     _instance: int
 
@@ -29,11 +35,41 @@ class Problem(metaclass=Singleton):
     _cust_open_time: np.ndarray
     _cust_close_time: np.ndarray
     _cust_pickup_demand: np.ndarray
-    _cust_deliver_demand: np.ndarray
+    _cust_delivery_demand: np.ndarray
     _cust_distances: np.ndarray
     
     _service_time: float
 
+    # Node-indexed data (node 0 is the DEPOT, customers are 1..cust_num).
+    _distances: np.ndarray
+    _veh_type: np.ndarray
+    _travel_times: np.ndarray
+    _km_costs: np.ndarray
+    _open_time: np.ndarray
+    _close_time: np.ndarray
+    _pickup_demand: np.ndarray
+    _delivery_demand: np.ndarray
+
+    # Granular neighbourhoods.
+    _neighbours: np.ndarray
+    _compatible: np.ndarray
+
+    # Shared memory block backing the arrays, if any, and whether this
+    # problem created (and thus owns) it.
+    _shm: Optional[shared_memory.SharedMemory] = None
+    _shm_owner: bool = False
+
+    _SCALARS = ('_instance', '_veh_num', '_veh_capacity', '_veh_tour_num',
+                '_veh_shift_num', '_cust_num', '_service_time')
+
+    _ARRAYS = ('_veh_spd', '_veh_km_cost', '_veh_tour_cost',
+               '_veh_shift_start', '_veh_shift_end', '_veh_shift_cost',
+               '_cust_open_time', '_cust_close_time', '_cust_pickup_demand',
+               '_cust_delivery_demand', '_veh_type', '_distances',
+               '_travel_times',
+               '_km_costs', '_open_time', '_close_time', '_pickup_demand',
+               '_delivery_demand', '_neighbours', '_compatible')
+
     @property
     def instance(self) -> int:
         return self._instance
@@ -95,8 +131,8 @@ class Problem(metaclass=Singleton):
         return self._cust_pickup_demand
 
     @property
-    def cust_deliver_demand(self) -> np.ndarray:
-        return self._cust_deliver_demand
+    def cust_delivery_demand(self) -> np.ndarray:
+        return self._cust_delivery_demand
 
     @property
     def cust_distances(self) -> np.ndarray:
@@ -108,41 +144,424 @@ class Problem(metaclass=Singleton):
 
     @property
     def distances(self) -> np.ndarray:
+        """
+        Contiguous (n + 1) x (n + 1) distance matrix, indexed by node. Node 0
+        is the DEPOT.
+        """
         return self._distances
 
+    @property
+    def veh_type(self) -> np.ndarray:
+        """
+        Maps each vehicle onto its type. Vehicles of the same type have the
+        same speed and km cost, and share their travel-time and km-cost
+        tables.
+        """
+        return self._veh_type
+
+    @property
+    def travel_times(self) -> np.ndarray:
+        """
+        Read-only (num_types, n + 1, n + 1) tensor of driving times between
+        nodes, per vehicle type.
+        """
+        return self._travel_times
+
+    @property
+    def km_costs(self) -> np.ndarray:
+        """
+        Read-only (num_types, n + 1, n + 1) tensor of driving costs between
+        nodes, per vehicle type.
+        """
+        return self._km_costs
+
+    def vehicle_travel_times(self, vehicle: int) -> np.ndarray:
+        """
+        Returns the (n + 1) x (n + 1) driving time matrix of the given
+        vehicle.
+        """
+        return self._travel_times[self._veh_type[vehicle]]
+
+    def vehicle_km_costs(self, vehicle: int) -> np.ndarray:
+        """
+        Returns the (n + 1) x (n + 1) driving cost matrix of the given
+        vehicle.
+        """
+        return self._km_costs[self._veh_type[vehicle]]
+
+    @property
+    def open_time(self) -> np.ndarray:
+        """
+        Opening times, indexed by node. The DEPOT is open from the start of
+        the first shift.
+        """
+        return self._open_time
+
+    @property
+    def close_time(self) -> np.ndarray:
+        """
+        Closing times, indexed by node. The DEPOT closes at the end of the
+        last shift.
+        """
+        return self._close_time
+
+    @property
+    def pickup_demand(self) -> np.ndarray:
+        """
+        Pickup demands, indexed by node. The DEPOT has no demand.
+        """
+        return self._pickup_demand
+
+    @property
+    def delivery_demand(self) -> np.ndarray:
+        """
+        Delivery demands, indexed by node. The DEPOT has no demand.
+        """
+        return self._delivery_demand
+
+    @property
+    def neighbours(self) -> np.ndarray:
+        """
+        Read-only (n + 1, k) array with, for each node, the k customers that
+        are nearest to it, sorted by increasing distance. Customers that
+        cannot be visited right before or after the node are skipped. Nodes
+        with fewer than k such customers have their lists padded with -1.
+        """
+        return self._neighbours
+
+    @property
+    def compatible(self) -> np.ndarray:
+        """
+        Read-only (n + 1) x (n + 1) boolean matrix, which is False for pairs of
+        customers (i, j) that cannot be visited as i -> j by any vehicle,
+        because of their time windows.
+        """
+        return self._compatible
+
+    def activate(self):
+        """
+        Makes this the current problem instance, as returned by ``Problem()``.
+        Used to switch back to an instance that was loaded before.
+        """
+        type(self).install(self)
+
     @classmethod
     def from_file(cls, location: str) -> Problem:
-        cls.clear()
+        """
+        Loads the problem instance at the given location. This is either a
+        Python data module, or a binary instance file (see ``to_binary``),
+        which is recognised by its BINARY_EXTENSION.
+        """
+        if location.endswith(BINARY_EXTENSION):
+            return cls.from_binary(location)
 
         spec = importlib.util.spec_from_file_location('data', location)
         data = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(data)
 
+        return cls.from_data(data)
+
+    @classmethod
+    def from_data(cls, data) -> Problem:
+        """
+        Creates the problem instance from the passed-in data, which is any
+        object with the attributes of an instance data module (INSTANCE_INDEX,
+        VEH_NUM, and so on).
+        """
+        cls.clear()
+
         problem = cls()
 
         problem._instance = int(data.INSTANCE_INDEX)
 
         problem._veh_num = int(data.VEH_NUM)
         problem._veh_capacity = int(data.VEH_CAPACITY)
-        problem._veh_spd = data.VEH_SPEED
-        problem._veh_km_cost = data.VEH_KM_COST
+        problem._veh_spd = np.asarray(data.VEH_SPEED, dtype=np.float64)
+        problem._veh_km_cost = np.asarray(data.VEH_KM_COST, dtype=np.float64)
 
         problem._veh_tour_num = int(data.VEH_TOUR_NUM)
-        problem._veh_tour_cost = data.VEH_TOUR_COST
+        problem._veh_tour_cost = np.asarray(data.VEH_TOUR_COST,
+                                            dtype=np.float64)
 
         problem._veh_shift_num = int(data.VEH_SHIFT_NUM)
-        problem._veh_shift_start = data.VEH_SHIFT_START
-        problem._veh_shift_end = data.VEH_SHIFT_END
-        problem._veh_shift_cost = data.VEH_SHIFT_COST
+        problem._veh_shift_start = np.asarray(data.VEH_SHIFT_START,
+                                              dtype=np.float64)
+        problem._veh_shift_end = np.asarray(data.VEH_SHIFT_END,
+                                            dtype=np.float64)
+        problem._veh_shift_cost = np.asarray(data.VEH_SHIFT_COST,
+                                             dtype=np.float64)
 
         problem._cust_num = int(data.CUST_NUM)
 
-        problem._cust_open_time = data.CUST_OPEN_TIME
-        problem._cust_close_time = data.CUST_CLOSE_TIME
+        problem._cust_open_time = np.asarray(data.CUST_OPEN_TIME,
+                                             dtype=np.float64)
+        problem._cust_close_time = np.asarray(data.CUST_CLOSE_TIME,
+                                              dtype=np.float64)
 
-        problem._cust_pickup_demand = data.CUST_PICKUP_DEMAND
-        problem._cust_delivery_demand = data.CUST_DELIVERY_DEMAND
-
-        problem._cust_distances = data.CUST_DISTANCES
+        problem._cust_pickup_demand = np.asarray(data.CUST_PICKUP_DEMAND,
+                                                 dtype=np.float64)
+        problem._cust_delivery_demand = np.asarray(data.CUST_DELIVERY_DEMAND,
+                                                   dtype=np.float64)
 
         problem._service_time = float(data.SERVICE_TIME)
+
+        problem._build_tables(data.CUST_DISTANCES)
+
+        return problem
+
+    def _build_tables(self, distances):
+        """
+        Builds the node-indexed lookup tables used by the routing code. This
+        is done once, at load time, so the inner loops only ever index into
+        these arrays.
+        """
+        num_nodes = self.cust_num + 1
+
+        self._distances = np.ascontiguousarray(distances, dtype=np.float64)
+        self._distances = self._distances.reshape(num_nodes, num_nodes)
+        self._distances.flags.writeable = False
+        self._cust_distances = self._distances
+
+        # Tables are built per vehicle type rather than per vehicle, since
+        # fleets typically have only a few types of vehicles.
+        veh_attrs = np.column_stack([self.veh_spd, self.veh_km_cost])
+        types, self._veh_type = np.unique(veh_attrs, axis=0,
+                                          return_inverse=True)
+        self._veh_type = self._veh_type.reshape(-1).astype(np.int64)
+        self._veh_type.flags.writeable = False
+
+        self._travel_times = self._distances / types[:, 0, None, None]
+        self._travel_times.flags.writeable = False
+
+        self._km_costs = self._distances * types[:, 1, None, None]
+        self._km_costs.flags.writeable = False
+
+        self._open_time = _with_depot(self.cust_open_time,
+                                      self.veh_shift_start.min())
+        self._close_time = _with_depot(self.cust_close_time,
+                                       self.veh_shift_end.max())
+
+        self._pickup_demand = _with_depot(self.cust_pickup_demand, 0)
+        self._delivery_demand = _with_depot(self.cust_delivery_demand, 0)
+
+        self._build_neighbourhoods()
+
+    def _build_neighbourhoods(self, block_size: int = 1024):
+        """
+        Builds the nearest neighbour lists, and time window compatibility
+        matrix. Both are computed in blocks of rows, to bound the memory used
+        for temporaries.
+        """
+        num_nodes = self.cust_num + 1
+        k = min(NUM_NEIGHBOURS, max(self.cust_num - 1, 0))
+
+        # Customers are compatible as i -> j if the earliest departure from
+        # i, with the fastest vehicle, allows serving j in its time window.
+        service = self.service_time * (self._delivery_demand
+                                       + self._pickup_demand)
+        earliest_leave = self._open_time + service
+        latest_start = self._close_time - service
+
+        self._neighbours = np.empty((num_nodes, k), dtype=np.int64)
+        self._compatible = np.empty((num_nodes, num_nodes), dtype=bool)
+
+        for start in range(0, num_nodes, block_size):
+            rows = np.arange(start, min(start + block_size, num_nodes))
+
+            fastest = self._travel_times[:, rows].min(axis=0)
+            self._compatible[rows] = earliest_leave[rows, None] + fastest \
+                <= latest_start[None, :]
+
+        self._compatible[0, :] = True  # the DEPOT has no time window
+        self._compatible[:, 0] = True
+
+        for start in range(0, num_nodes, block_size):
+            rows = np.arange(start, min(start + block_size, num_nodes))
+
+            # Columns are customers 1, ..., n. Customers that cannot be
+            # visited right before or after a node, and the node itself, are
+            # never its nearest neighbours, but padding.
+            distances = np.array(self._distances[rows, 1:])
+            adjacent = self._compatible[rows, 1:] \
+                | self._compatible[1:, rows].T
+            distances[~adjacent] = np.inf
+
+            customers = rows[rows > 0]
+            distances[customers - start, customers - 1] = np.inf
+
+            if k > 0:
+                nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                order = np.take_along_axis(distances, nearest, 1).argsort(1)
+                nearest = np.take_along_axis(nearest, order, 1)
+
+                padding = np.take_along_axis(distances, nearest, 1) == np.inf
+                self._neighbours[rows] = np.where(padding, -1, nearest + 1)
+
+        self._neighbours.flags.writeable = False
+        self._compatible.flags.writeable = False
+
+    def to_shared_memory(self) -> Dict[str, Any]:
+        """
+        Publishes this problem's arrays into a single shared memory block, and
+        returns a small, picklable descriptor that ``from_shared_memory`` uses
+        to attach to it. The block lives until ``release_shared_memory`` is
+        called.
+        """
+        self.release_shared_memory()
+
+        layout, size = self._layout()
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._shm_owner = True
+
+        for attr, dtype, shape, offset in layout:
+            shared = np.ndarray(shape, dtype, self._shm.buf, offset)
+            shared[...] = getattr(self, attr)
+
+        self._attach(layout, self._shm.buf)
+
+        return dict(name=self._shm.name,
+                    scalars={attr: getattr(self, attr)
+                             for attr in self._SCALARS},
+                    layout=layout)
+
+    @classmethod
+    def from_shared_memory(cls, descriptor: Dict[str, Any]) -> Problem:
+        """
+        Attaches to the shared memory block described by the passed-in
+        descriptor (see ``to_shared_memory``). The arrays are read-only views
+        into the shared block, so no data is copied.
+        """
+        cls.clear()
+
+        problem = cls()
+
+        for attr, value in descriptor["scalars"].items():
+            setattr(problem, attr, value)
+
+        problem._shm = shared_memory.SharedMemory(name=descriptor["name"])
+        problem._attach(descriptor["layout"], problem._shm.buf)
+
+        return problem
+
+    def release_shared_memory(self):
+        """
+        Releases the shared memory block, if this problem created one. The
+        arrays are copied back into process-local memory first. Processes
+        attached to the block through ``from_shared_memory`` keep working.
+        """
+        if self._shm is None or not self._shm_owner:
+            return
+
+        for attr in self._ARRAYS:  # owned copies, so the block can close
+            setattr(self, attr, np.array(getattr(self, attr)))
+            getattr(self, attr).flags.writeable = False
+
+        self._cust_distances = self._distances
+
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+        self._shm_owner = False
+
+    def to_binary(self, location: str):
+        """
+        Writes this problem to a binary instance file. The file starts with
+        BINARY_MAGIC and the length of a JSON header, followed by the header,
+        which holds the scalar fields and array layout. The arrays follow,
+        each 64-byte aligned.
+        """
+        layout, size = self._layout()
+
+        header = json.dumps(dict(
+            scalars={attr: getattr(self, attr) for attr in self._SCALARS},
+            layout=layout)).encode()
+
+        data_offset = _align(len(BINARY_MAGIC) + 8 + len(header))
+
+        with open(location, 'wb') as file:
+            file.write(BINARY_MAGIC)
+            file.write(len(header).to_bytes(8, 'little'))
+            file.write(header)
+
+            for attr, _, _, offset in layout:
+                file.seek(data_offset + offset)
+                file.write(np.ascontiguousarray(getattr(self, attr)).data)
+
+            file.truncate(data_offset + size)
+
+    @classmethod
+    def from_binary(cls, location: str) -> Problem:
+        """
+        Loads a binary instance file written by ``to_binary``. The arrays are
+        read-only views into a memory map of the file, so loading does not
+        read or copy the array data up front.
+        """
+        with open(location, 'rb') as file:
+            if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                raise ValueError(f"{location}: not a binary instance file.")
+
+            header_size = int.from_bytes(file.read(8), 'little')
+            header = json.loads(file.read(header_size))
+
+        if {attr for attr, *_ in header["layout"]} != set(cls._ARRAYS):
+            raise ValueError(f"{location}: outdated binary instance file; "
+                             "convert the instance again.")
+
+        cls.clear()
+
+        problem = cls()
+
+        for attr, value in header["scalars"].items():
+            setattr(problem, attr, value)
+
+        data_offset = _align(len(BINARY_MAGIC) + 8 + header_size)
+        data = np.memmap(location, np.uint8, mode='r', offset=data_offset)
+        problem._attach(header["layout"], data)
+
+        return problem
+
+    def _layout(self):
+        """
+        Returns the layout of this problem's arrays in a single, contiguous
+        block, as (attribute, dtype, shape, offset) tuples, and the size of
+        that block.
+        """
+        layout = []
+        size = 0
+
+        for attr in self._ARRAYS:
+            array = getattr(self, attr)
+            layout.append((attr, array.dtype.str, array.shape, size))
+            size += _align(array.nbytes)
+
+        return layout, size
+
+    def _attach(self, layout, buffer):
+        for attr, dtype, shape, offset in layout:
+            array = np.ndarray(shape, dtype, buffer, offset)
+            array.flags.writeable = False
+
+            setattr(self, attr, array)
+
+        self._cust_distances = self._distances
+
+
+def _align(size: int) -> int:
+    """
+    Rounds the passed-in size up to a multiple of 64 bytes.
+    """
+    return -(-size // 64) * 64
+
+
+def _with_depot(data: np.ndarray, depot_value: float) -> np.ndarray:
+    """
+    Returns a read-only, node-indexed copy of the passed-in customer data,
+    with the DEPOT's value at index zero.
+    """
+    nodes = np.empty(len(data) + 1, dtype=np.float64)
+    nodes[0] = depot_value
+    nodes[1:] = data
+    nodes.flags.writeable = False
+
+    return nodes
@@ -1,39 +1,152 @@
+from __future__ import annotations
+
 import operator
+from array import array
 from copy import deepcopy
-from itertools import islice, takewhile, tee
-from typing import Dict, List, Optional, Tuple, Union
+from itertools import islice, takewhile
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 
 import numpy as np
 
 from heuristic.constants import DEPOT
+from .EvaluationCache import EvaluationCache
 from .Problem import Problem
 
 
-class Route:
-    __slots__ = ['customers', 'plan', '_route_cost', '_handling_cost']
+class RouteArrays(NamedTuple):
+    """
+    Array views of a route's profiles, for vectorised evaluation.
+    """
+    customers: np.ndarray
+    leave: np.ndarray  # service end times
+    latest: np.ndarray
+    load_prefix_max: np.ndarray
+    load_suffix_max: np.ndarray
+
+
+def _as_array(typecode: str, values) -> array:
+    """
+    Returns a typed array of the passed-in values, copied at memcpy speed
+    when these are already an array, or a NumPy array.
+    """
+    dtype = np.int64 if typecode == 'q' else np.float64
+    result = array(typecode)
+    result.frombytes(np.ascontiguousarray(values, dtype=dtype).tobytes())
+    return result
 
-    customers: List[int]  # visited customers
-    schedule: List[float]
-    load: List[int]
-    plan: List[list]
+
+def _evaluation_cache() -> EvaluationCache:
+    cache = EvaluationCache()
+    cache.check_problem()
+    return cache
+
+
+class Route:
+    __slots__ = ['customers', 'schedule', 'load', 'vehicle_id', '_delivery',
+                 '_pickup', '_route_cost', '_dirty', '_handling_cost',
+                 '_shift', '_arrival', '_waiting', '_latest',
+                 '_load_prefix_max', '_load_suffix_max', '_arrays',
+                 '_fingerprint']
+
+    # All per-visit data is stored in typed arrays, which are compact, and
+    # grow in amortised O(1). Insertions and removals are memmoves, and
+    # copies memcpys.
+    customers: array  # visited customers
+    schedule: array  # service start times
+    load: array  # load on departure from each visit, after the initial load
+    _delivery: array  # planned delivery amount of each visit
+    _pickup: array  # planned pickup amount of each visit
     vehicle_id: int # vehicle ID
 
     # 0 -> 1 -> 2 -> 0
     _route_cost: Optional[float]  # cached results
+    _dirty: bool  # set when the cached results are stale
+
+    # Zobrist-style hash of the vehicle, departure time, initial load, legs
+    # and visits: the XOR of a key for each. Updated in O(1) per change.
+    _fingerprint: int
+
+    # Profiles, used to answer insertion queries in O(1). Forward time slack
+    # at an index is _latest[index] - schedule[index].
+    _shift: int  # shift containing the departure time
+    _arrival: array  # arrival times, before waiting
+    _waiting: array  # waiting times before service may start
+    _latest: array  # latest feasible service start times
+    _load_prefix_max: array  # max(load[:index + 1])
+    _load_suffix_max: array  # max(load[index:])
+    _arrays: Optional[RouteArrays]  # cached array copies of the above
 
     def __init__(self, customers: List[int], schedule: List[float],
-                 load: List[int], plan: List[list], vehicle_id: int):
-        self.customers = customers
-        self.schedule = schedule
-        self.load = load
-        self.plan = plan
+                 load: List[float], plan: List[list], vehicle_id: int):
+        """
+        Creates a route for the given vehicle. Only the departure time, that
+        is, the first schedule entry, and the initial load are used as given:
+        the rest of the schedule and load are derived from the customers and
+        plan, which is a (delivery, pickup) pair for each visit.
+        """
+        plan = np.asarray(plan, dtype=np.float64).reshape(-1, 2)
+
+        self.customers = _as_array('q', customers)
+        self.schedule = _as_array('d', schedule)
+        self.load = _as_array('d', load)
+        self._delivery = _as_array('d', plan[:, 0])
+        self._pickup = _as_array('d', plan[:, 1])
         self.vehicle_id = vehicle_id
 
         self._route_cost = None
+        self._dirty = True
+
+        # Only the initial load in excess of the deliveries is fixed: the
+        # rest changes with the visits, which have their own keys.
+        excess_load = self.load[0] - sum(self._delivery)
+        self._fingerprint = hash((self.vehicle_id, self.schedule[0],
+                                  excess_load))
+
+        for index, customer in enumerate(self.customers):
+            self._fingerprint ^= self._visit_key(index)
+
+            if index > 0:
+                prev = self.customers[index - 1]
+                self._fingerprint ^= hash((prev, customer))
+
+        self._update_profiles()
 
         if not self.can_insert():
             raise Exception('Invalid solution for the route.')
 
+    @classmethod
+    def empty(cls, vehicle_id: int, shift: int) -> Route:
+        """
+        Returns an empty route for the given vehicle, departing from the DEPOT
+        at the start of the given shift.
+        """
+        departure = float(Problem().veh_shift_start[shift])
+
+        return cls([DEPOT, DEPOT], [departure, departure], [0, 0, 0],
+                   [[0, 0], [0, 0]], vehicle_id)
+
+    def __deepcopy__(self, memodict={}):
+        route = Route.__new__(Route)
+
+        for slot in self.__slots__:
+            if hasattr(self, slot):
+                value = getattr(self, slot)
+
+                # Cached array copies are never changed, so can be shared.
+                setattr(route, slot,
+                        value[:] if isinstance(value, array) else value)
+
+        return route
+
+    @property
+    def plan(self) -> np.ndarray:
+        """
+        Returns the (delivery, pickup) plan of each visit, as an array. This
+        is a copy, so changing it does not change the route.
+        """
+        return np.column_stack((np.array(self._delivery),
+                                np.array(self._pickup)))
+
     def cost(self) -> float:
         """
         Returns the cost (objective) value of this route, based on the
@@ -44,171 +157,400 @@ class Route:
     def routing_cost(self) -> float:
         """
         Determines the route cost connecting this route's customers, and the
-        DEPOT. O(1).
+        DEPOT. O(1) when cached, O(|customers|) otherwise.
         """
-        _distance = 0
-        problem = Problem()
+        if self._dirty:
+            costs = _evaluation_cache().costs
+            self._route_cost = costs.get(self._fingerprint)
+
+            if self._route_cost is None:
+                problem = Problem()
+                km_costs = problem.vehicle_km_costs(self.vehicle_id)
+                customers = np.asarray(self.customers)
+                legs = km_costs[customers[:-1], customers[1:]]
 
-        if self._route_cost is None:
-            route = self.customers
-            _distance = Route.distance(route)
+                self._route_cost = float(legs.sum())
+                costs.put(self._fingerprint, self._route_cost)
+
+            self._dirty = False
 
-        self._route_cost = problem.veh_km_cost[self.vehicle_id] * _distance
         return self._route_cost
 
-    def distance(self, customers: List[int]) -> float:
+    @property
+    def fingerprint(self) -> int:
+        """
+        Returns a 64-bit hash of this route: routes with the same vehicle,
+        departure time, visits and plans have the same fingerprint. O(1).
+        """
+        return self._fingerprint
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Tests if the cached routing cost is stale, that is, if the route was
+        changed since the cost was last computed.
+        """
+        return self._dirty
+
+    def invalidate_routing_cache(self):
+        self._dirty = True
+
+    @staticmethod
+    def distance(customers: List[int]) -> float:
         """
         Computes the distance for the passed-in list of visited customer nodes.
         Does not assume this list forms a tour. O(|customers|).
         """
         problem = Problem()
+        customers = np.asarray(customers)
+
+        return float(problem.distances[customers[:-1], customers[1:]].sum())
+
+    @property
+    def shift(self) -> int:
+        return self._shift
+
+    def slack(self, index: int) -> float:
+        """
+        Returns the forward time slack at the given index: the amount of time
+        service may be delayed there without violating any later time window,
+        or the shift end. O(1).
+        """
+        return self._latest[index] - self.schedule[index]
+
+    def arrays(self) -> RouteArrays:
+        """
+        Returns (cached) array views of this route's customers and profiles.
+        The arrays are rebuilt only after the route has changed.
+        """
+        if self._arrays is None:
+            problem = Problem()
+
+            # These are copies: views would prevent the typed arrays from
+            # being resized.
+            service = problem.service_time * (np.array(self._delivery)
+                                              + np.array(self._pickup))
 
-        # Constructs two iterators from the passed-in customers. This is fairly
-        # efficient, as it avoids copying.
-        from_custs, to_custs = tee(customers)
-        next(to_custs, None)
+            self._arrays = RouteArrays(np.array(self.customers),
+                                       np.array(self.schedule) + service,
+                                       np.array(self._latest),
+                                       np.array(self._load_prefix_max),
+                                       np.array(self._load_suffix_max))
 
-        return sum(problem.distances[first + 1, second + 1]
-                   for first, second in zip(from_custs, to_custs))
+        return self._arrays
+
+    def insertion_feasible(self, customer: int, at: int, plan: list) -> bool:
+        """
+        Tests if inserting the passed-in customer at the given index, with the
+        given (delivery, pickup) plan, results in a feasible route. Uses the
+        time slack and load profiles, and does not modify this route. O(1).
+        """
+        if not 0 < at < len(self.customers) or customer == DEPOT:
+            return False
+
+        problem = Problem()
+        delivery, pickup = plan
+
+        # Deliveries are carried from the DEPOT up to the customer, pickups
+        # from the customer back to the DEPOT.
+        if self._load_prefix_max[at] + delivery > problem.veh_capacity:
+            return False
+
+        if self._load_suffix_max[at] + pickup > problem.veh_capacity:
+            return False
+
+        travel_times = problem.vehicle_travel_times(self.vehicle_id)
+        prev, succ = self.customers[at - 1], self.customers[at]
+
+        prev_leave = self.schedule[at - 1] + self._service_time(at - 1)
+        start = max(prev_leave + travel_times[prev, customer],
+                    problem.open_time[customer])
+        leave = start + problem.service_time * (delivery + pickup)
+
+        if leave > problem.close_time[customer]:
+            return False
+
+        succ_start = max(leave + travel_times[customer, succ],
+                         problem.open_time[succ])
+
+        return succ_start <= self._latest[at]
+
+    def insert_customer(self, customer: int, at: int, plan: list) -> bool:
+        """
+        Inserts the customer at the given index, and incrementally refreshes
+        the profiles. Returns whether the resulting route is feasible.
+        """
+        feasible = self.insertion_feasible(customer, at, plan)
+
+        delivery, pickup = plan
 
-    def insert_customer(self, customer: int, at: int, plan: list):
         self.customers.insert(at, customer)
-        self.plan.insert(at, plan)
+        self._delivery.insert(at, delivery)
+        self._pickup.insert(at, pickup)
+        self.invalidate_routing_cache()
 
-        self._update_schedule()
-        self._update_load()
+        self.schedule.insert(at, np.nan)
+        self._arrival.insert(at, np.nan)
+        self._waiting.insert(at, 0.)
+        self._latest.insert(at, np.nan)
+
+        self.load[0] += delivery
+        self.load.insert(at, 0.)
+
+        self._toggle_visit(at)
+        self._update_profiles(at)
+
+        return feasible
+
+    def remove_customer(self, customer: int) -> bool:
+        """
+        Removes all visits to the passed-in customer, and incrementally
+        refreshes the profiles. Returns whether the resulting route is
+        feasible.
+        """
+        while customer in self.customers:
+            self.remove_at(self.customers.index(customer))
 
         return self.can_insert()
 
-    def remove_customer(self, customer: int):
-        try:
-            index = self.customers.index(customer)
-            while True:
-                del self.customers[index]
-                del self.plan[index]
-                index = self.customers.index(customer)
-        except ValueError:
-            self._update_schedule()
-            self._update_load()
+    def remove_at(self, index: int) -> list:
+        """
+        Removes the visit at the given index, and incrementally refreshes the
+        profiles. This is the inverse of ``insert_customer``, and returns the
+        removed visit's plan. The resulting route is not validated.
+        """
+        self._toggle_visit(index)
+
+        plan = [self._delivery[index], self._pickup[index]]
+        self.load[0] -= plan[0]
+
+        del self.customers[index]
+        del self._delivery[index]
+        del self._pickup[index]
+        self.invalidate_routing_cache()
+
+        del self.schedule[index]
+        del self._arrival[index]
+        del self._waiting[index]
+        del self._latest[index]
+        del self.load[index]
+
+        self._update_profiles(index)
 
-            return self.can_insert()
+        return plan
+
+    def _service_time(self, index: int) -> float:
+        return Problem().service_time \
+            * (self._delivery[index] + self._pickup[index])
+
+    def _update_profiles(self, at: Optional[int] = None):
+        """
+        Refreshes the schedule, slack and load profiles after a change at the
+        given index. When no index is given, all profiles are rebuilt.
+        """
+        self._arrays = None
+
+        if at is None:
+            problem = Problem()
+            shifts = problem.veh_shift_start
+            self._shift = max(int(np.searchsorted(shifts, self.schedule[0],
+                                                  side='right')) - 1, 0)
+
+            # NaN placeholders never compare equal, so these are always
+            # overwritten by the propagation below.
+            size = len(self.customers)
+            self.schedule = self.schedule[:1] + array('d', [np.nan]) \
+                * (size - 1)
+            self._arrival = self.schedule[:]
+            self._waiting = array('d', [0.]) * size
+            self._latest = array('d', [np.nan]) * size
+
+            self._update_schedule(1)
+            self._update_latest(size - 1)
+        else:
+            self._update_schedule(max(at, 1))
+            self._update_latest(min(at, len(self.customers) - 1))
 
-    def _update_schedule(self):
+        self._update_load()
+
+    def _update_schedule(self, start: int):
+        """
+        Propagates arrival and service start times forward from the given
+        index, until the schedule is unchanged.
+        """
         problem = Problem()
 
-        self.schedule = [self.schedule[0]]
+        travel_times = problem.vehicle_travel_times(self.vehicle_id)
+        open_time = problem.open_time
 
-        for index in range(len(self.customers)):
+        for index in range(start, len(self.customers)):
             customer = self.customers[index]
+            prev_customer = self.customers[index - 1]
 
-            loads_to_handle = self.plan[customer][0] + self.plan[customer][1]
-            service_time = problem.SERVICE_TIME * loads_to_handle
+            leave_time = self.schedule[index - 1] \
+                + self._service_time(index - 1)
+            arrival_time = leave_time + travel_times[prev_customer, customer]
+
+            # wait for the customer to open if we arrive early.
+            service_start = float(max(arrival_time, open_time[customer]))
+
+            self._arrival[index] = float(arrival_time)
+            self._waiting[index] = service_start - arrival_time
+
+            if index > start and service_start == self.schedule[index]:
+                break
 
-            arrival_time = self.schedule[customer]
-            leave_time = arrival_time + service_time
+            self.schedule[index] = service_start
+
+    def _update_latest(self, start: int):
+        """
+        Propagates the latest feasible service start times backward from the
+        given index, until they are unchanged.
+        """
+        problem = Problem()
+
+        travel_times = problem.vehicle_travel_times(self.vehicle_id)
+        close_time = problem.close_time
+        last = len(self.customers) - 1
+
+        for index in range(start, -1, -1):
+            customer = self.customers[index]
+            latest = close_time[customer] - self._service_time(index)
 
-            # calculate next arrival time
-            if index < len(self.customers) - 1:
+            if index == last:
+                latest = min(latest, problem.veh_shift_end[self._shift])
+            else:
                 next_customer = self.customers[index + 1]
-                distance = problem.distances[customer, next_customer]
-                vehicle_speed = problem.VEH_SPEED[self.vehicle_id]
-                drive_time = distance / vehicle_speed
-                next_arrival_time = leave_time + drive_time
-                next_open_time = problem.CUST_OPEN_TIME[next_customer]
+                latest = min(latest, self._latest[index + 1]
+                             - travel_times[customer, next_customer]
+                             - self._service_time(index))
 
-                if next_arrival_time < next_open_time:
-                    next_arrival_time = next_open_time
-                self.schedule.append(next_arrival_time)
+            latest = float(latest)
+
+            if index < start and latest == self._latest[index]:
+                break
+
+            self._latest[index] = latest
 
     def _update_load(self):
-        self.load = [self.load[0]]
-        for index in range(len(self.plan)):
-            plan = self.plan[index]
-            delivery = plan[0]
-            pickup = plan[1]
+        """
+        Rebuilds the load profile from the initial load and the plan, and its
+        prefix and suffix maxima. Each insertion or removal changes the
+        initial load, and thus the load on every leg, so the whole profile is
+        computed, by a cumulative sum over views of the plan arrays.
+        """
+        delivery = np.frombuffer(self._delivery, dtype=np.float64)
+        pickup = np.frombuffer(self._pickup, dtype=np.float64)
+
+        load = np.empty(len(delivery) + 1)
+        load[0] = self.load[0]
+        np.subtract(pickup, delivery, out=load[1:])
+        np.cumsum(load, out=load)
+
+        self.load = array('d', load.tobytes())
+        self._load_prefix_max = array(
+            'd', np.maximum.accumulate(load).tobytes())
+        self._load_suffix_max = array(
+            'd', np.maximum.accumulate(load[::-1])[::-1].tobytes())
+
+    def _visit_key(self, index: int) -> int:
+        return hash((self.customers[index], self._delivery[index],
+                     self._pickup[index]))
 
-            new_load = self.load[index] - delivery + pickup
-            self.load.append(new_load)
+    def _toggle_visit(self, index: int):
+        """
+        Adds the visit at the given index to the fingerprint, or removes it
+        from the fingerprint, which is the same. The legs to and from the
+        visit are toggled, as is the leg that replaces these. O(1).
+        """
+        customer = self.customers[index]
+        self._fingerprint ^= self._visit_key(index)
+
+        has_prev = index > 0
+        has_succ = index < len(self.customers) - 1
+
+        if has_prev:
+            prev = self.customers[index - 1]
+            self._fingerprint ^= hash((prev, customer))
+
+        if has_succ:
+            succ = self.customers[index + 1]
+            self._fingerprint ^= hash((customer, succ))
+
+        if has_prev and has_succ:
+            self._fingerprint ^= hash((prev, succ))
 
     def can_insert(self):
-        result = True
-        result = result and self._validate_customers()
-        result = result and self._validate_schedule()
-        result = result and self._validate_load()
-        result = result and self._validate_plan()
+        verdicts = _evaluation_cache().verdicts
+        result = verdicts.get(self._fingerprint)
+
+        if result is None:
+            result = True
+            result = result and self._validate_customers()
+            result = result and self._validate_schedule()
+            result = result and self._validate_shift()
+            result = result and self._validate_load()
+            result = result and self._validate_plan()
+
+            verdicts.put(self._fingerprint, bool(result))
+
         return result
 
     def _validate_customers(self):
-        result = True
         if self.customers[0] != DEPOT or self.customers[-1] != DEPOT:
-            result = False
-
-        try:
-            index = self.customers[1, -1].index(DEPOT)
-        except ValueError:
-            return result
+            return False
 
-        result = False
-        return result
+        return DEPOT not in self.customers[1:-1]
 
     def _validate_schedule(self):
         problem = Problem()
 
-        result = True
-        for index in range(len(self.customers)):
-            customer = self.customers[index]
+        customers = np.asarray(self.customers)
+        schedule = np.asarray(self.schedule)
+        service = np.asarray(self._delivery) + np.asarray(self._pickup)
 
-            arrival_time = self.schedule[customer]
-            loads_to_handle = self.plan[customer][0] + self.plan[customer][1]
-            service_time = problem.SERVICE_TIME * loads_to_handle
-            leave_time = arrival_time + service_time
+        leave_time = schedule + problem.service_time * service
 
-            open_time = problem.CUST_OPEN_TIME[customer]
-            close_time = problem.CUST_CLOSE_TIME[customer]
+        if np.any(problem.open_time[customers] > schedule):
+            return False
 
-            if open_time > arrival_time or close_time < leave_time:
-                result = False
-                break
+        if np.any(problem.close_time[customers] < leave_time):
+            return False
 
-            # validate next arrival time
-            if index < len(self.customers) - 1:
-                next_customer = self.customers[index + 1]
-                distance = problem.distances[customer, next_customer]
-                vehicle_speed = problem.VEH_SPEED[self.vehicle_id]
-                drive_time = distance / vehicle_speed
-                next_arrival_time = leave_time + drive_time
-                next_customer_arrival_time = self.schedule[index + 1]
+        # validate next arrival times
+        travel_times = problem.vehicle_travel_times(self.vehicle_id)
+        drive_time = travel_times[customers[:-1], customers[1:]]
 
-                if leave_time + drive_time > next_customer_arrival_time:
-                    result = False
-                    break
+        return not np.any(leave_time[:-1] + drive_time > schedule[1:])
 
-        return result
+    def _validate_shift(self):
+        problem = Problem()
+
+        if self.schedule[0] < problem.veh_shift_start[self._shift]:
+            return False
+
+        return self.schedule[-1] <= problem.veh_shift_end[self._shift]
 
     def _validate_load(self):
-        result = True
+        problem = Problem()
 
-        for index in range(len(self.plan)):
-            plan = self.plan[index]
-            delivery = plan[0]
-            pickup = plan[1]
+        load = np.asarray(self.load)
+        delivery = np.asarray(self._delivery)
+        pickup = np.asarray(self._pickup)
 
-            if self.load[index] - delivery + pickup != self.load[index + 1]:
-                result = False
-                break
+        if np.any(load[:-1] - delivery + pickup != load[1:]):
+            return False
 
-        return result
+        return load.min() >= 0 and load.max() <= problem.veh_capacity
 
     def _validate_plan(self):
         problem = Problem()
 
-        delivery_demand = problem.CUST_DELIVERY_DEMAND
-        pickup_demand = problem.CUST_PICKUP_DEMAND
+        customers = np.asarray(self.customers)
 
-        result = True
-        for plan in self.plan:
-            if plan[0] > delivery_demand or plan[1] > pickup_demand:
-                result = False
-                break
+        if np.any(np.asarray(self._delivery)
+                  > problem.delivery_demand[customers]):
+            return False
 
-        return result
+        return not np.any(np.asarray(self._pickup)
+                          > problem.pickup_demand[customers])
@@ -9,6 +9,9 @@ class Singleton(type):
 
         return cls._instances[cls]
 
+    def install(cls, instance):
+        Singleton._instances[cls] = instance
+
     def clear(cls):
         try:
             del Singleton._instances[cls]
@@ -1,44 +1,371 @@
 from __future__ import annotations
 
+import json
 from copy import copy, deepcopy
-from typing import List
+from typing import Dict, Iterable, List, Optional
 
-import matplotlib.pyplot as plt
 import numpy as np
-from alns import State
 
-from heuristic.constants import DEPOT, TEAM_NUMBER
-from .Problem import Problem
+from heuristic.constants import TEAM_NUMBER, UNASSIGNED_PENALTY
+from .BitSetList import BitSetList
+from .Problem import Problem, _align
 from .Route import Route
-from .Stacks import Stacks
 
+SOLUTION_MAGIC = b'ALNSSOLN'
 
-class Solution(State):
-    __slots__ = ['routes', 'unassigned']
 
-    routes: List[Route]
-    unassigned: List[int]
+class Solution:
+    __slots__ = ['routes', 'unassigned', '_route_of', '_position_of',
+                 '_objective', '_fingerprint', '_log', '_parent', '_frozen',
+                 '_spare']
 
-    def __init__(self, routes: List[Route], unassigned: List[int]):
+    routes: List[Route]
+    unassigned: BitSetList
+
+    # Reverse index, mapping each customer to the index of its route in
+    # ``routes``, and its position in that route. Both are -1 for customers
+    # that are not routed.
+    _route_of: np.ndarray
+    _position_of: np.ndarray
+
+    # Running objective value, updated by per-route deltas.
+    _objective: float
+
+    # XOR of the route fingerprints, updated by per-route deltas.
+    _fingerprint: int
+
+    # Transactions. A candidate solution shares its routes with its parent,
+    # and records the inverse of each change in an undo log, so it can be
+    # committed or rolled back in O(changed positions). Frozen solutions
+    # (stored best solutions) never share their own routes: a candidate gets
+    # a spare copy instead.
+    _log: Optional[List[tuple]]  # undo log of the open transaction
+    _parent: Optional[Solution]
+    _frozen: bool
+    _spare: Optional[List[Route]]  # routes equal to, but not of, this one
+
+    def __init__(self, routes: List[Route], unassigned: Iterable[int]):
         self.routes = routes
-        self.unassigned = unassigned
+        self.unassigned = BitSetList(unassigned, Problem().cust_num + 1)
+
+        self._build_index()
+        self._objective = sum(route.cost() for route in self.routes)
+
+        self._fingerprint = 0
+
+        for route in self.routes:
+            self._fingerprint ^= route.fingerprint
+
+        self._log = None
+        self._parent = None
+        self._frozen = True
+        self._spare = None
 
     def __copy__(self):
-        return Solution(copy(self.routes), copy(self.unassigned))
+        return self._with(copy(self.routes), copy(self.unassigned))
 
     def __deepcopy__(self, memodict={}):
-        return Solution(deepcopy(self.routes), deepcopy(self.unassigned))
+        return self._with(deepcopy(self.routes), deepcopy(self.unassigned))
+
+    def _with(self, routes: List[Route], unassigned: BitSetList) -> Solution:
+        """
+        Returns a new solution for the passed-in routes and unassigned
+        customers, which should be copies of this solution's. The reverse
+        index is carried over, rather than rebuilt.
+        """
+        solution = Solution.__new__(Solution)
+
+        solution.routes = routes
+        solution.unassigned = unassigned
+
+        solution._route_of = self._route_of.copy()
+        solution._position_of = self._position_of.copy()
+
+        solution._objective = self._objective
+        solution._fingerprint = self._fingerprint
+
+        solution._log = None
+        solution._parent = None
+        solution._frozen = True
+        solution._spare = None
+
+        return solution
+
+    def begin(self) -> Solution:
+        """
+        Returns a candidate solution, initially equal to this solution, that
+        records its changes in an undo log. The candidate must be committed
+        or rolled back before this solution is used again, unless this
+        solution is frozen.
+
+        Unless this solution is frozen, the candidate shares its routes, so no
+        copy is made. Otherwise the candidate works on a spare copy, which is
+        made once, and handed back on rollback.
+        """
+        if not self._frozen:
+            routes = self.routes
+        elif self._spare is not None:
+            routes, self._spare = self._spare, None
+        else:
+            routes = deepcopy(self.routes)
+
+        candidate = self._with(routes, copy(self.unassigned))
+        candidate._log = []
+        candidate._parent = self
+        candidate._frozen = False
+
+        return candidate
+
+    def commit(self):
+        """
+        Ends the open transaction, keeping all changes. When the parent
+        solution is not frozen, its routes are now this solution's, and the
+        parent should no longer be used.
+        """
+        self._log = None
+        self._parent = None
+
+    def rollback(self):
+        """
+        Ends the open transaction, undoing all changes, in reverse order. The
+        parent solution is then valid again. O(changed positions).
+        """
+        if self._log is None:
+            return
+
+        for entry in reversed(self._log):
+            action, *args = entry
+
+            if action == "insert":
+                route, at = args
+                route.remove_at(at)
+            elif action == "remove":
+                route, customer, at, plan = args
+                route.insert_customer(customer, at, plan)
+            elif action == "add_route":
+                self.routes.pop()
+            elif action == "replace_route":
+                idx_route, route = args
+                self.routes[idx_route] = route
+            else:  # remove_empty_routes
+                self.routes, = args
+
+        parent = self._parent
+
+        if parent is not None and parent._frozen:
+            parent._spare = self.routes
+
+        self._log = None
+        self._parent = None
+
+    def freeze(self):
+        """
+        Freezes this solution, typically because it is stored as the best
+        solution. Candidates started from it no longer share its routes.
+        """
+        self._frozen = True
+
+    @property
+    def route_of(self) -> np.ndarray:
+        """
+        Read-only view of the reverse index: the route index of each customer,
+        or -1 when the customer is not routed.
+        """
+        view = self._route_of.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def position_of(self) -> np.ndarray:
+        """
+        Read-only view of the reverse index: the position of each customer in
+        its route, or -1 when the customer is not routed.
+        """
+        view = self._position_of.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def fingerprint(self) -> int:
+        """
+        Returns a 64-bit hash of this solution's routes, which does not
+        depend on their order. Solutions with the same routes have the same
+        fingerprint, and thus the same objective. O(1).
+        """
+        return self._fingerprint
 
     def find_route(self, customer: int) -> Route:
         """
         Finds and returns the Route containing the passed-in customer. Raises
-        a LookupError if no such Route exists. O(num_routes).
+        a LookupError if no such Route exists. O(1).
         """
-        for route in self.routes:
-            if customer in route:
-                return route
+        idx_route = self._route_of[customer]
+
+        if idx_route < 0:
+            raise LookupError(f"Customer {customer} is not understood.")
+
+        return self.routes[idx_route]
+
+    def find_position(self, customer: int) -> int:
+        """
+        Returns the position of the passed-in customer in its Route. Raises a
+        LookupError if the customer is not routed. O(1).
+        """
+        position = self._position_of[customer]
+
+        if position < 0:
+            raise LookupError(f"Customer {customer} is not understood.")
+
+        return int(position)
+
+    def is_routed(self, customer: int) -> bool:
+        """
+        Tests if the passed-in customer is visited by any Route. O(1).
+        """
+        return self._route_of[customer] >= 0
+
+    def add_route(self, route: Route):
+        """
+        Adds the passed-in route to this solution.
+        """
+        self.routes.append(route)
+        self._index_route(len(self.routes) - 1)
+
+        self._fingerprint ^= route.fingerprint
+
+        if self._log is not None:
+            self._log.append(("add_route",))
+
+        self._objective += route.cost()
+
+    def add_empty_routes(self):
+        """
+        Adds an empty route for every shift a vehicle is not yet used in, as
+        long as that vehicle has tours left. Each vehicle does at most one
+        tour per shift, so its tours never overlap.
+        """
+        problem = Problem()
+        used = {(route.vehicle_id, route.shift) for route in self.routes}
+
+        for vehicle in range(problem.veh_num):
+            tours = sum(1 for veh, _ in used if veh == vehicle)
+
+            for shift in range(problem.veh_shift_num):
+                if tours >= problem.veh_tour_num:
+                    break
+
+                if (vehicle, shift) not in used:
+                    self.add_route(Route.empty(vehicle, shift))
+                    tours += 1
 
-        raise LookupError(f"Customer {customer} is not understood.")
+    def insert_customer(self, customer: int, idx_route: int, at: int,
+                        plan: list) -> bool:
+        """
+        Inserts the customer in the route at the given index, and updates the
+        reverse index. Returns whether the resulting route is feasible.
+        O(|route|).
+        """
+        route = self.routes[idx_route]
+        before = route.cost()
+        self._fingerprint ^= route.fingerprint
+
+        feasible = route.insert_customer(customer, at, plan)
+        self._index_route(idx_route, at)
+        self._fingerprint ^= route.fingerprint
+
+        if self._log is not None:
+            self._log.append(("insert", route, at))
+
+        self._objective += route.cost() - before
+
+        return feasible
+
+    def remove_customer(self, customer: int):
+        """
+        Removes the customer from its route, and updates the reverse index.
+        O(|route|).
+        """
+        idx_route = self._route_of[customer]
+        at = self.find_position(customer)
+
+        route = self.routes[idx_route]
+        before = route.cost()
+        self._fingerprint ^= route.fingerprint
+
+        plan = route.remove_at(at)
+        self._fingerprint ^= route.fingerprint
+
+        if self._log is not None:
+            self._log.append(("remove", route, customer, at, plan))
+        self._objective += route.cost() - before
+
+        self._route_of[customer] = -1
+        self._position_of[customer] = -1
+        self._index_route(idx_route, at)
+
+    def replace_route(self, idx_route: int, route: Route):
+        """
+        Replaces the route at the given index by the passed-in route, which
+        should visit the same customers, and updates the reverse index.
+        O(|route|).
+        """
+        old = self.routes[idx_route]
+
+        self.routes[idx_route] = route
+        self._index_route(idx_route)
+
+        self._objective += route.cost() - old.cost()
+        self._fingerprint ^= old.fingerprint ^ route.fingerprint
+
+        if self._log is not None:
+            self._log.append(("replace_route", idx_route, old))
+
+    def remove_empty_routes(self):
+        """
+        Removes routes that do not visit any customers, and remaps the
+        reverse index onto the remaining routes.
+        """
+        keep = [len(route.customers) > 2 for route in self.routes]
+
+        if all(keep):
+            return
+
+        # Maps old route indices onto new ones; the extra final entry maps
+        # unrouted customers (-1) onto themselves.
+        remap = np.append(np.cumsum(keep) - 1, -1)
+
+        for route, kept in zip(self.routes, keep):
+            if not kept:
+                self._objective -= route.cost()
+                self._fingerprint ^= route.fingerprint
+
+        if self._log is not None:
+            self._log.append(("remove_empty_routes", self.routes))
+
+        self.routes = [route for route, kept in zip(self.routes, keep) if kept]
+        self._route_of = remap[self._route_of]
+
+    def _build_index(self):
+        size = Problem().cust_num + 1
+
+        self._route_of = np.full(size, -1, dtype=np.int64)
+        self._position_of = np.full(size, -1, dtype=np.int64)
+
+        for idx_route in range(len(self.routes)):
+            self._index_route(idx_route)
+
+    def _index_route(self, idx_route: int, start: int = 1):
+        """
+        (Re)indexes the customers of the given route, from the start position
+        onwards. Customers are assumed to be visited only once.
+        """
+        start = max(start, 1)  # skip the DEPOT
+        customers = np.asarray(self.routes[idx_route].customers[start:-1],
+                               dtype=np.int64)
+
+        self._route_of[customers] = idx_route
+        self._position_of[customers] = np.arange(start,
+                                                 start + len(customers))
 
     def cost(self) -> float:
         """
@@ -49,14 +376,69 @@ class Solution(State):
 
     def objective(self) -> float:
         """
-        Evaluates the current solution.
+        Evaluates the current solution: the routing costs, and a penalty for
+        each unassigned customer. The routing costs are a running total, kept
+        up to date by the insert and remove methods on this solution, so
+        routes should not be changed directly. O(1).
+        """
+        return self._objective + UNASSIGNED_PENALTY * len(self.unassigned)
+
+    def to_compact(self) -> Dict[str, np.ndarray]:
+        """
+        Returns a compact representation of this solution, as a few flat
+        arrays. Only the customers, plans, vehicles and departure times of
+        the routes are stored; everything else is derived again by
+        ``from_compact``.
         """
-        return sum(route.cost() for route in self.routes)
+        sizes = [len(route.customers) for route in self.routes]
+
+        if self.routes:
+            customers = np.concatenate([route.customers
+                                        for route in self.routes])
+            plans = np.concatenate([route.plan for route in self.routes])
+        else:
+            customers = np.empty(0)
+            plans = np.empty((0, 2))
+
+        return dict(
+            vehicles=np.array([route.vehicle_id for route in self.routes],
+                              dtype=np.int64),
+            departures=np.array([route.schedule[0] for route in self.routes],
+                                dtype=np.float64),
+            sizes=np.array(sizes, dtype=np.int64),
+            customers=customers.astype(np.int64),
+            plans=plans.astype(np.float64).reshape(-1, 2),
+            unassigned=self.unassigned.to_array())
+
+    @classmethod
+    def from_compact(cls, compact: Dict[str, np.ndarray]) -> Solution:
+        """
+        Rebuilds a solution from the representation returned by
+        ``to_compact``.
+        """
+        bounds = np.cumsum(compact["sizes"])[:-1]
+        route_customers = np.split(compact["customers"], bounds)
+        route_plans = np.split(compact["plans"], bounds)
+
+        routes = []
+
+        for vehicle, departure, customers, plan in zip(compact["vehicles"],
+                                                       compact["departures"],
+                                                       route_customers,
+                                                       route_plans):
+            routes.append(Route(customers.tolist(), [float(departure)],
+                                [plan[:, 0].sum()], plan.tolist(),
+                                int(vehicle)))
+
+        return cls(routes, compact["unassigned"])
 
     def plot(self):
         """
         Plots the current solution state.
         """
+        # Imported here, since pyplot is slow to import, and rarely needed.
+        import matplotlib.pyplot as plt
+
         # Number of columns is customers + depot, and a final column for route
         # cost.
         n_cols = max(len(route) for route in self.routes) + 2
@@ -109,64 +491,127 @@ class Solution(State):
     @classmethod
     def from_file(cls, location: str) -> Solution:
         """
-        Reads a solution from the file system.
+        Reads a solution from a text file written by ``to_file``. Customers
+        that are not routed are unassigned.
         """
         problem = Problem()
 
         with open(location) as file:
-            data = file.readlines()
+            _, instance, _, *lines = file.read().splitlines()
+
+        if int(instance) != problem.instance:
+            raise ValueError(f"{location}: solution to instance {instance}, "
+                             f"not to instance {problem.instance}.")
 
-        routes = [Route([], []) for _ in range(int(data[2]))]
-        data = data[3:]  # first three lines are metadata
+        fields = np.array([line.split(",") for line in lines if line],
+                          dtype=str).reshape(-1, 6)
 
-        for line in data:
-            vehicle, node, stack, *items = line.strip().split(",")
+        route_ids = np.char.lstrip(fields[:, 0], "V").astype(np.int64)
+        customers = fields[:, 2].astype(np.int64)
 
-            idx_route = int(vehicle[1:]) - 1
-            route = routes[idx_route]
+        # Index of the first visit of each route, which is at the DEPOT.
+        firsts = np.flatnonzero(np.diff(route_ids, prepend=-1))
 
-            customer = int(node) - 1
+        compact = dict(
+            vehicles=fields[firsts, 1].astype(np.int64),
+            departures=fields[firsts, 3].astype(np.float64),
+            sizes=np.diff(np.append(firsts, len(fields))),
+            customers=customers,
+            plans=fields[:, 4:].astype(np.float64),
+            unassigned=np.setdiff1d(np.arange(1, problem.cust_num + 1),
+                                    customers))
 
-            if customer != DEPOT and customer not in route:
-                route.customers.append(customer)
+        return cls.from_compact(compact)
 
-            idx_stack = int(stack[1:]) - 1
+    def to_file(self, location: str):
+        """
+        Writes this solution to a text file. After three lines of metadata
+        (the team number, instance and number of routes), each line is a
+        visit: the route, vehicle, customer, start of service, and the
+        delivery and pickup amounts. The lines are formatted in bulk, and
+        written at once.
+        """
+        compact = self.to_compact()
+
+        route_ids = np.repeat(np.arange(1, len(self.routes) + 1),
+                              compact["sizes"])
+        vehicles = np.repeat(compact["vehicles"], compact["sizes"])
+        starts = np.concatenate([route.schedule for route in self.routes]) \
+            if self.routes else np.empty(0)
 
-            if idx_stack == 0:  # new loading plan (next leg).
-                route.plan.append(Stacks(problem.num_stacks))
+        lines = [str(TEAM_NUMBER), str(Problem().instance),
+                 str(len(self.routes))]
 
-            stack = route.plan[-1][idx_stack]
+        lines.extend(f"V{route},{vehicle},{customer},{start},{delivery},"
+                     f"{pickup}"
+                     for route, vehicle, customer, start, (delivery, pickup)
+                     in zip(route_ids.tolist(), vehicles.tolist(),
+                            compact["customers"].tolist(), starts.tolist(),
+                            compact["plans"].tolist()))
 
-            for str_item in items:
-                if not str_item:  # empty stack
-                    continue
+        with open(location, 'w') as file:
+            file.write("\n".join(lines) + "\n")
 
-                item_type = str_item[0]
-                customer = int(str_item[1:]) - 1
+    def to_binary(self, location: str):
+        """
+        Writes this solution to a binary solution file, which holds the arrays
+        of ``to_compact``. The file starts with SOLUTION_MAGIC and the length
+        of a JSON header, followed by the header, which holds the instance and
+        array layout. The arrays follow, each 64-byte aligned.
+        """
+        compact = self.to_compact()
+        layout = []
+        size = 0
 
-                if item_type == "d":
-                    stack.push_rear(problem.demands[customer])
-                else:
-                    stack.push_rear(problem.pickups[customer])
+        for name, array in compact.items():
+            layout.append((name, array.dtype.str, array.shape, size))
+            size = _align(size + array.nbytes)
 
-        return Solution(routes, [])
+        header = json.dumps(dict(instance=Problem().instance,
+                                 layout=layout)).encode()
 
-    def to_file(self, location: str):
+        data_offset = _align(len(SOLUTION_MAGIC) + 8 + len(header))
+
+        with open(location, 'wb') as file:
+            file.write(SOLUTION_MAGIC)
+            file.write(len(header).to_bytes(8, 'little'))
+            file.write(header)
+
+            for name, _, _, offset in layout:
+                file.seek(data_offset + offset)
+                file.write(np.ascontiguousarray(compact[name]).data)
+
+            file.truncate(data_offset + size)
+
+    @classmethod
+    def from_binary(cls, location: str) -> Solution:
         """
-        Writes this solution to the file system.
+        Reads a binary solution file written by ``to_binary``.
         """
-        file = open(location, 'w+')
+        with open(location, 'rb') as file:
+            data = file.read()
+
+        if not data.startswith(SOLUTION_MAGIC):
+            raise ValueError(f"{location}: not a binary solution file.")
+
+        header_size = int.from_bytes(data[len(SOLUTION_MAGIC):
+                                          len(SOLUTION_MAGIC) + 8], 'little')
+        header = json.loads(data[len(SOLUTION_MAGIC) + 8:
+                                 len(SOLUTION_MAGIC) + 8 + header_size])
+
+        if header["instance"] != Problem().instance:
+            raise ValueError(f"{location}: solution to instance "
+                             f"{header['instance']}, not to instance "
+                             f"{Problem().instance}.")
 
-        print(TEAM_NUMBER, file=file)
-        print(Problem().instance, file=file)
-        print(len(self.routes), file=file)
+        data_offset = _align(len(SOLUTION_MAGIC) + 8 + header_size)
+        compact = {}
 
-        for idx_route, route in enumerate(self.routes, 1):
-            legs = np.array([DEPOT, *route.customers])
-            legs += 1
+        for name, dtype, shape, offset in header["layout"]:
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape))
 
-            for idx_leg, leg in enumerate(legs):
-                for idx_stack, stack in enumerate(route.plan[idx_leg], 1):
-                    print(f"V{idx_route},{leg},S{idx_stack},{stack}", file=file)
+            compact[name] = np.frombuffer(data, dtype, count,
+                                          data_offset + offset).reshape(shape)
 
-        file.close()
+        return cls.from_compact(compact)
@@ -1 +1,6 @@
-from .Problem import Problem
\ No newline at end of file
+from .BitSetList import BitSetList
+from .EvaluationCache import EvaluationCache, LRUCache
+from .Problem import Problem
+from .Route import Route
+from .SetList import SetList
+from .Solution import Solution
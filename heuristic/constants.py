@@ -1 +1,58 @@
-DEPOT = 0
\ No newline at end of file
+DEPOT = 0
+
+TEAM_NUMBER = 1  # first line of each solution file
+
+# Fraction of the customers removed by each destroy operator.
+DEGREE_OF_DESTRUCTION = 0.15
+
+# Randomisation of the related (Shaw) and worst removal operators: higher
+# values select more deterministically. See Ropke and Pisinger (2006).
+SHAW_DETERMINISM = 6
+WORST_DETERMINISM = 3
+
+# Relatedness weights of distance, time window overlap and demand similarity,
+# for related (Shaw) removal.
+SHAW_WEIGHTS = (9, 3, 2)
+
+# Weights of distance (routing cost), time until service may start, and
+# urgency, for the nearest neighbour construction heuristic. See Solomon
+# (1987).
+NEAREST_NEIGHBOUR_WEIGHTS = (0.4, 0.4, 0.2)
+
+# Number of nearest neighbours per customer, used by granular insertion.
+NUM_NEIGHBOURS = 20
+
+# Local search: lengths of the segments relocated by or-opt moves, and the
+# maximum number of improving moves checked for feasibility per round.
+OR_OPT_LENGTHS = (1, 2, 3)
+LOCAL_SEARCH_CHECKS = 20
+
+# Local search: number of route sizes whose move indices are cached.
+MOVE_INDICES_CACHE_SIZE = 64
+
+# Maximum number of route evaluations (costs, feasibility verdicts) cached.
+EVALUATION_CACHE_SIZE = 100_000
+
+# Cost of each customer that is not visited by any route. This is large, so
+# serving more customers always improves the objective.
+UNASSIGNED_PENALTY = 10_000
+
+# ALNS parameters
+ITERATIONS = 10_000
+WEIGHTS = [25, 5, 1, 0]  # new global best, better, accepted, rejected
+DECAY = 0.8
+SEGMENT_LENGTH = 100  # iterations between operator weight updates
+
+# Simulated annealing, fitted to accept a 5% worse solution with 50%
+# probability at the start of the search.
+WORSE = 0.05
+ACCEPT_PROB = 0.5
+
+# Parallel search: number of iterations between incumbent exchanges.
+EXCHANGE_INTERVAL = 500
+
+# Seconds between checkpoints of the incumbent, at most.
+CHECKPOINT_INTERVAL = 30.
+
+# Solver daemon: number of loaded problem instances that are kept.
+PROBLEM_CACHE_SIZE = 8
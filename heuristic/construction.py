@@ -0,0 +1,126 @@
+from typing import List
+
+import numpy as np
+
+from heuristic.classes import Problem, Route, Solution
+from heuristic.constants import DEPOT, NEAREST_NEIGHBOUR_WEIGHTS
+
+
+def nearest_neighbour() -> Solution:
+    """
+    Constructs a solution with the time-oriented nearest neighbour heuristic
+    of Solomon (1987). Routes are built one at a time, for each shift and
+    each vehicle with tours left. Each route is extended by the feasible
+    customer 'closest' to its last customer, until no customer fits.
+    Closeness combines distance, time until service may start, and urgency:
+    the time left until the customer closes.
+
+    Candidates are evaluated together, so each extension is vectorised over
+    all unassigned customers. Customers that fit in no route remain
+    unassigned.
+    """
+    problem = Problem()
+
+    unassigned = np.arange(1, problem.cust_num + 1)
+    tours = np.zeros(problem.veh_num, dtype=np.int64)
+    routes = []
+
+    for shift in range(problem.veh_shift_num):
+        for vehicle in range(problem.veh_num):
+            if len(unassigned) == 0:
+                break
+
+            if tours[vehicle] >= problem.veh_tour_num:
+                continue
+
+            customers = _build_route(vehicle, shift, unassigned)
+
+            if len(customers) == 0:
+                continue
+
+            tours[vehicle] += 1
+            unassigned = np.setdiff1d(unassigned, customers,
+                                      assume_unique=True)
+
+            plan = np.column_stack((problem.delivery_demand[customers],
+                                    problem.pickup_demand[customers]))
+            plan = np.vstack(([0., 0.], plan, [0., 0.]))
+
+            routes.append(Route([DEPOT, *customers, DEPOT],
+                                [float(problem.veh_shift_start[shift])],
+                                [plan[:, 0].sum()], plan, vehicle))
+
+    return Solution(routes, unassigned)
+
+
+def _build_route(vehicle: int, shift: int,
+                 candidates: np.ndarray) -> List[int]:
+    """
+    Returns the customers of a single route for the given vehicle and shift,
+    selected from the candidates. The route departs from the DEPOT at the
+    start of the shift.
+    """
+    problem = Problem()
+
+    travel_times = problem.vehicle_travel_times(vehicle)
+    km_costs = problem.vehicle_km_costs(vehicle)
+    dist_weight, time_weight, urgency_weight = NEAREST_NEIGHBOUR_WEIGHTS
+
+    # The DEPOT has no service time, and must be reached before it closes,
+    # and before the end of the shift.
+    depot_close = min(problem.close_time[DEPOT],
+                      problem.veh_shift_end[shift])
+
+    delivery = problem.delivery_demand[candidates]
+    pickup = problem.pickup_demand[candidates]
+    service = problem.service_time * (delivery + pickup)
+
+    # Customers that do not fit on an empty vehicle never fit.
+    fits = np.maximum(delivery, pickup) <= problem.veh_capacity
+    candidates, delivery, pickup, service \
+        = candidates[fits], delivery[fits], pickup[fits], service[fits]
+
+    customers = []
+    last = DEPOT
+    leave = float(problem.veh_shift_start[shift])
+
+    # Appending a customer adds its delivery to the initial load, and thus
+    # to the load on every leg so far. Its pickup is added to the load on
+    # the final leg only.
+    max_load = 0.
+    final_load = 0.
+
+    while len(candidates) != 0:
+        arrival = leave + travel_times[last, candidates]
+        start = np.maximum(arrival, problem.open_time[candidates])
+        done = start + service
+
+        back = done + travel_times[candidates, DEPOT]
+
+        feasible = done <= problem.close_time[candidates]
+        feasible &= np.maximum(back, problem.open_time[DEPOT]) <= depot_close
+        feasible &= max_load + delivery <= problem.veh_capacity
+        feasible &= final_load + pickup <= problem.veh_capacity
+
+        if not feasible.any():
+            break
+
+        closeness = dist_weight * km_costs[last, candidates]
+        closeness += time_weight * (start - leave)
+        closeness += urgency_weight * (problem.close_time[candidates] - done)
+        closeness[~feasible] = np.inf
+
+        idx = int(np.argmin(closeness))
+
+        last = int(candidates[idx])
+        leave = float(done[idx])
+        final_load += pickup[idx]
+        max_load = max(max_load + delivery[idx], final_load)
+
+        customers.append(last)
+
+        keep = np.arange(len(candidates)) != idx
+        candidates, delivery, pickup, service \
+            = candidates[keep], delivery[keep], pickup[keep], service[keep]
+
+    return customers
@@ -0,0 +1,34 @@
+import argparse
+import os
+
+from heuristic.classes import Problem
+from heuristic.classes.Problem import BINARY_EXTENSION
+
+
+def convert(location: str, destination: str = None) -> str:
+    """
+    Converts the Python data module at the passed-in location to a binary
+    instance file, and returns the destination. By default the binary file
+    is written next to the data module.
+    """
+    if destination is None:
+        destination = os.path.splitext(location)[0] + BINARY_EXTENSION
+
+    Problem.from_file(location).to_binary(destination)
+    return destination
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="heuristic.convert",
+        description="Converts instance data modules to binary instance files.")
+
+    parser.add_argument("locations", nargs="+",
+                        help="instance data module locations.")
+
+    for location in parser.parse_args().locations:
+        print(f"{location} -> {convert(location)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import socketserver
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable
+
+from numpy.random import default_rng
+
+from heuristic.classes import LRUCache, Problem, Solution
+from heuristic.constants import PROBLEM_CACHE_SIZE
+# This imports alns, which imports matplotlib.pyplot (via alns.Result). That
+# is slow, but the daemon pays for it once, at startup, not per request.
+from heuristic.solve import Incumbent, initial_solution, solve
+
+Respond = Callable[[Dict[str, Any]], None]
+
+
+class ProblemCache:
+    """
+    Keeps the most recently used problem instances loaded, so repeated
+    requests for an instance do not load it again. Entries are keyed by
+    location and modification time, so changed instance files are loaded
+    again.
+    """
+    _problems: LRUCache[Problem]
+
+    def __init__(self, maxsize: int = PROBLEM_CACHE_SIZE):
+        self._problems = LRUCache(maxsize)
+
+    def load(self, location: str) -> Problem:
+        """
+        Returns the problem instance at the passed-in location, and makes it
+        the current instance (see ``Problem.activate``).
+        """
+        key = (os.path.abspath(location), os.stat(location).st_mtime_ns)
+        problem = self._problems.get(key)
+
+        if problem is None:
+            problem = Problem.from_file(location)
+            self._problems.put(key, problem)
+        else:
+            problem.activate()
+
+        return problem
+
+
+def serve(lines: Iterable[str], respond: Respond, problems: ProblemCache):
+    """
+    Handles the requests on the passed-in lines, one at a time. Each line is
+    a JSON object with the instance location, and optionally an id, the
+    budgets of ``solve`` (iterations, max_runtime and max_stagnation), a
+    seed, and whether new best solutions should be streamed.
+
+    Responses are JSON objects, passed to respond. Streamed solutions are
+    "best" events, and each request ends with a "done" or "error" event.
+    Responses carry the id of their request.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+
+        request_id = None
+
+        try:
+            request = json.loads(line)
+
+            if not isinstance(request, dict):
+                raise ValueError("request is not a JSON object.")
+
+            request_id = request.get("id")
+            _handle(request, respond, problems)
+        except Exception as error:
+            respond(dict(id=request_id, event="error", error=repr(error)))
+
+
+def _handle(request: Dict[str, Any], respond: Respond,
+            problems: ProblemCache):
+    start = time.perf_counter()
+    request_id = request.get("id")
+
+    problem = problems.load(request["instance"])
+    seed = request.get("seed", problem.instance)
+    rnd_state = default_rng(seed)
+
+    def stream(incumbent: Incumbent):
+        respond(dict(id=request_id, event="best",
+                     objective=incumbent.objective,
+                     unassigned=len(incumbent.solution.unassigned),
+                     runtime=incumbent.runtime))
+
+    result = solve(initial_solution(rnd_state), rnd_state,
+                   request.get("iterations"), request.get("max_runtime"),
+                   request.get("max_stagnation"),
+                   stream if request.get("stream", False) else None)
+    best = result.best_state
+
+    respond(dict(id=request_id, event="done", objective=best.objective(),
+                 routes=_routes(best), unassigned=best.unassigned.to_list(),
+                 iterations=len(result.statistics.objectives) - 1,
+                 runtime=time.perf_counter() - start))
+
+
+def _routes(solution: Solution):
+    return [dict(vehicle=int(route.vehicle_id),
+                 departure=route.schedule[0],
+                 customers=list(route.customers[1:-1]))
+            for route in solution.routes]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        def respond(response: Dict[str, Any]):
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+        lines = (line.decode() for line in self.rfile)
+        serve(lines, respond, self.server.problems)
+
+
+def serve_socket(location: str, problems: ProblemCache):
+    """
+    Serves requests on a Unix socket at the passed-in location, until
+    interrupted. Connections are handled one at a time, since the current
+    problem instance is global. Each connection may send many requests.
+    """
+    if os.path.exists(location):
+        os.unlink(location)
+
+    with socketserver.UnixStreamServer(location, _Handler) as server:
+        server.problems = problems
+
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(location)
+
+
+def _respond_stdout(response: Dict[str, Any]):
+    print(json.dumps(response), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="heuristic.daemon",
+        description="Resident solver, that reads requests as JSON lines, and "
+                    "streams back the results as JSON lines.")
+
+    parser.add_argument("--socket",
+                        help="location of a Unix socket to serve on; reads "
+                             "stdin and writes stdout otherwise.")
+    parser.add_argument("--cache-size", type=int, default=PROBLEM_CACHE_SIZE,
+                        help="number of loaded problem instances kept.")
+
+    args = parser.parse_args()
+    problems = ProblemCache(args.cache_size)
+
+    if args.socket:
+        try:
+            serve_socket(args.socket, problems)
+        except KeyboardInterrupt:
+            pass
+    else:
+        serve(sys.stdin, _respond_stdout, problems)
+
+
+if __name__ == "__main__":
+    main()
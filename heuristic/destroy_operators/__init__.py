@@ -3,8 +3,12 @@ from typing import Callable, List
 from numpy.random import RandomState
 
 from heuristic.classes import Solution
-from .cross_route import cross_route
+from .random_customers import random_customers
+from .related_removal import related_removal
+from .worst_removal import worst_removal
 
 D_OPERATORS: List[Callable[[Solution, RandomState], Solution]] = [
     random_customers,
+    related_removal,
+    worst_removal,
 ]
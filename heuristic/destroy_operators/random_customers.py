@@ -1,5 +1,3 @@
-from copy import deepcopy
-
 from numpy.random import Generator
 
 from heuristic.classes import Problem, Solution
@@ -14,14 +12,18 @@ def random_customers(current: Solution, rnd_state: Generator) -> Solution:
 
     Random removal in Hornstra et al. (2020).
     """
-    destroyed = deepcopy(current)
+    destroyed = current.begin()
 
-    for customer in rnd_state.choice(Problem().num_customers,
-                                     customers_to_remove(),
-                                     replace=False):
-        destroyed.unassigned.append(customer)
+    # Customers are nodes 1, ..., cust_num; node 0 is the DEPOT.
+    for customer in 1 + rnd_state.choice(Problem().cust_num,
+                                         customers_to_remove(),
+                                         replace=False):
+        customer = int(customer)
 
-        route = destroyed.find_route(customer)
-        route.remove_customer(customer)
+        if not destroyed.is_routed(customer):  # already unassigned
+            continue
+
+        destroyed.unassigned.append(customer)
+        destroyed.remove_customer(customer)
 
     return destroyed
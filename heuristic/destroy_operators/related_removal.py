@@ -0,0 +1,68 @@
+import numpy as np
+from numpy.random import Generator
+
+from heuristic.classes import Problem, Solution
+from heuristic.constants import SHAW_DETERMINISM, SHAW_WEIGHTS
+from heuristic.functions import customers_to_remove, remove_empty_routes
+
+
+@remove_empty_routes
+def related_removal(current: Solution, rnd_state: Generator) -> Solution:
+    """
+    Removes related customers (Shaw removal). Starting from a random routed
+    customer, repeatedly picks an already removed customer, and removes a
+    remaining customer that is strongly related to it. Customers are related
+    when they are close, have overlapping time windows, and similar demands.
+
+    Related removal in Ropke and Pisinger (2006).
+    """
+    problem = Problem()
+    destroyed = current.begin()
+
+    routed = np.flatnonzero(destroyed.route_of >= 0)
+
+    if len(routed) == 0:
+        return destroyed
+
+    demand = problem.delivery_demand + problem.pickup_demand
+    dist_weight, time_weight, demand_weight = SHAW_WEIGHTS
+
+    # Normalisation constants, so each term of the relatedness measure is in
+    # [0, 1].
+    max_distance = max(problem.distances.max(), 1e-9)
+    max_demand = max(demand.max(), 1e-9)
+
+    removed = [int(rnd_state.choice(routed))]
+    remaining = routed[routed != removed[0]]
+
+    for _ in range(min(customers_to_remove(), len(routed)) - 1):
+        seed = removed[rnd_state.integers(len(removed))]
+
+        # Time window overlap, as a fraction of the narrower window.
+        overlap = np.minimum(problem.close_time[seed],
+                             problem.close_time[remaining]) \
+            - np.maximum(problem.open_time[seed],
+                         problem.open_time[remaining])
+        width = np.minimum(problem.close_time[seed] - problem.open_time[seed],
+                           problem.close_time[remaining]
+                           - problem.open_time[remaining])
+        overlap = np.clip(overlap / np.maximum(width, 1e-9), 0, 1)
+
+        # Lower is more related.
+        relatedness = dist_weight * problem.distances[seed, remaining] \
+            / max_distance
+        relatedness += time_weight * (1 - overlap)
+        relatedness += demand_weight \
+            * np.abs(demand[seed] - demand[remaining]) / max_demand
+
+        rank = int(rnd_state.random() ** SHAW_DETERMINISM * len(remaining))
+        idx = np.argpartition(relatedness, rank)[rank]
+
+        removed.append(int(remaining[idx]))
+        remaining = np.delete(remaining, idx)
+
+    for customer in removed:
+        destroyed.unassigned.append(customer)
+        destroyed.remove_customer(customer)
+
+    return destroyed
@@ -0,0 +1,30 @@
+import numpy as np
+from numpy.random import Generator
+
+from heuristic.classes import Solution
+from heuristic.constants import WORST_DETERMINISM
+from heuristic.functions import (customers_to_remove, removal_gains,
+                                 remove_empty_routes)
+
+
+@remove_empty_routes
+def worst_removal(current: Solution, rnd_state: Generator) -> Solution:
+    """
+    Removes customers with large removal gains: the routing cost saved by
+    removing them from their route. Customers are ranked by gain once, and
+    then selected with a bias towards the top of the ranking, as in Ropke
+    and Pisinger (2006).
+    """
+    destroyed = current.begin()
+
+    customers, gains = removal_gains(destroyed)
+    ranked = customers[np.argsort(-gains, kind="stable")].tolist()
+
+    for _ in range(min(customers_to_remove(), len(ranked))):
+        idx = int(rnd_state.random() ** WORST_DETERMINISM * len(ranked))
+        customer = ranked.pop(idx)
+
+        destroyed.unassigned.append(customer)
+        destroyed.remove_customer(customer)
+
+    return destroyed
@@ -0,0 +1,7 @@
+from .customers_to_remove import customers_to_remove
+from .full_plan import full_plan
+from .improve_routes import improve_routes
+from .insertion_costs import best_route_insertions, insertion_costs
+from .local_search import local_search
+from .removal_gains import removal_gains
+from .remove_empty_routes import remove_empty_routes
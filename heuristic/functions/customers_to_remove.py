@@ -0,0 +1,10 @@
+from heuristic.classes import Problem
+from heuristic.constants import DEGREE_OF_DESTRUCTION
+
+
+def customers_to_remove() -> int:
+    """
+    Returns the number of customers to remove from the solution, which is at
+    least one.
+    """
+    return max(int(Problem().cust_num * DEGREE_OF_DESTRUCTION), 1)
@@ -0,0 +1,12 @@
+from heuristic.classes import Problem
+
+
+def full_plan(customer: int) -> list:
+    """
+    Returns the (delivery, pickup) plan that serves all of the passed-in
+    customer's demand in a single visit.
+    """
+    problem = Problem()
+
+    return [float(problem.delivery_demand[customer]),
+            float(problem.pickup_demand[customer])]
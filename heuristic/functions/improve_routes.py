@@ -0,0 +1,31 @@
+from functools import wraps
+
+import numpy as np
+
+from .local_search import local_search
+
+
+def improve_routes(operator):
+    """
+    Wrapper function that applies local search to the routes of the returned
+    solution instance into which the operator inserted customers. Other
+    routes are unchanged, so these are not optimised again.
+    """
+
+    @wraps(operator)
+    def decorator(state, rnd_state, **kwargs):
+        unassigned = state.unassigned.to_array()
+
+        repaired = operator(state, rnd_state, **kwargs)
+        touched = np.unique(repaired.route_of[unassigned])
+
+        for idx_route in touched[touched >= 0]:
+            route = repaired.routes[idx_route]
+            improved = local_search(route)
+
+            if improved is not route:
+                repaired.replace_route(int(idx_route), improved)
+
+        return repaired
+
+    return decorator
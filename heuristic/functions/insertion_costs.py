@@ -0,0 +1,197 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from heuristic.classes import Problem, Route, Solution
+
+
+def insertion_costs(solution: Solution, customer: int, plan: list,
+                    granular: bool = False
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes the insertion cost of the passed-in customer for every leg of
+    every route in the solution, in a single gather over the routes' arrays.
+    Returns the route indices, positions and cost deltas of the feasible
+    insertions, ranked by increasing cost delta.
+
+    In granular mode only insertions next to the customer's nearest
+    neighbours, on the DEPOT legs of their routes, and into empty routes are
+    evaluated: O(k) rather than O(n).
+    """
+    if granular:
+        result = _granular_insertion_costs(solution, customer, plan)
+    else:
+        result = _insertion_costs(solution.routes, customer, plan)
+
+    routes, positions, deltas = result
+
+    order = np.argsort(deltas, kind="stable")
+    return routes[order], positions[order], deltas[order]
+
+
+def _insertion_costs(routes: List[Route], customer: int, plan: list):
+    problem = Problem()
+
+    if len(routes) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+
+    arrays = [route.arrays() for route in routes]
+    sizes = [len(route_arrays.customers) - 1 for route_arrays in arrays]
+
+    # Each leg (prev -> succ) is a candidate position for the customer. The
+    # position is the index of succ in its route.
+    vehicles = np.repeat([route.vehicle_id for route in routes], sizes)
+    route_idcs = np.repeat(np.arange(len(routes)), sizes)
+    positions = np.concatenate([np.arange(1, size + 1) for size in sizes])
+
+    feasible, deltas = _evaluate(
+        problem.veh_type[vehicles],
+        np.concatenate([ra.customers[:-1] for ra in arrays]),
+        np.concatenate([ra.customers[1:] for ra in arrays]),
+        np.concatenate([ra.leave[:-1] for ra in arrays]),
+        np.concatenate([ra.latest[1:] for ra in arrays]),
+        np.concatenate([ra.load_prefix_max[1:-1] for ra in arrays]),
+        np.concatenate([ra.load_suffix_max[1:-1] for ra in arrays]),
+        customer, plan)
+
+    return route_idcs[feasible], positions[feasible], deltas[feasible]
+
+
+def _granular_insertion_costs(solution: Solution, customer: int, plan: list):
+    problem = Problem()
+
+    # Inserting right before, or right after each routed neighbour, if the
+    # time windows allow visiting them in that order.
+    neighbours = problem.neighbours[customer]
+    neighbours = neighbours[neighbours >= 0]
+    neighbours = neighbours[solution.route_of[neighbours] >= 0]
+
+    before = neighbours[problem.compatible[customer, neighbours]]
+    after = neighbours[problem.compatible[neighbours, customer]]
+
+    # Empty routes of the same vehicle type and shift are interchangeable,
+    # so only one of each is evaluated.
+    empty = {}
+
+    for idx, route in enumerate(solution.routes):
+        if len(route.customers) == 2:
+            key = (problem.veh_type[route.vehicle_id], route.shift)
+            empty.setdefault(key, idx)
+
+    empty = list(empty.values())
+
+    # The DEPOT legs of the neighbours' routes are also evaluated.
+    near_routes = np.unique(solution.route_of[neighbours])
+    last = [len(solution.routes[idx].customers) - 1 for idx in near_routes]
+
+    route_idcs = np.concatenate([solution.route_of[before],
+                                 solution.route_of[after],
+                                 near_routes,
+                                 near_routes,
+                                 empty]).astype(np.int64)
+    positions = np.concatenate([solution.position_of[before],
+                                solution.position_of[after] + 1,
+                                np.ones(len(near_routes)),
+                                last,
+                                np.ones(len(empty))]).astype(np.int64)
+
+    if len(route_idcs) == 0:
+        return route_idcs, route_idcs, np.empty(0)
+
+    # Inserting after one neighbour may be the same as inserting before
+    # another; such duplicates are removed.
+    keys = np.unique(route_idcs * (problem.cust_num + 2) + positions)
+    route_idcs, positions = np.divmod(keys, problem.cust_num + 2)
+
+    routes = [solution.routes[idx] for idx in route_idcs]
+    arrays = [route.arrays() for route in routes]
+
+    def gather(field: str, offset: int = 0) -> np.ndarray:
+        return np.array([getattr(route_arrays, field)[at + offset]
+                         for route_arrays, at in zip(arrays, positions)])
+
+    feasible, deltas = _evaluate(
+        problem.veh_type[[route.vehicle_id for route in routes]],
+        gather("customers", -1), gather("customers"), gather("leave", -1),
+        gather("latest"), gather("load_prefix_max"),
+        gather("load_suffix_max"), customer, plan)
+
+    return route_idcs[feasible], positions[feasible], deltas[feasible]
+
+
+def _evaluate(types, prev, succ, prev_leave, succ_latest, prefix_max,
+              suffix_max, customer: int, plan: list):
+    """
+    Vectorised feasibility check and cost delta of inserting the customer
+    between each prev and succ pair. This mirrors Route.insertion_feasible.
+    """
+    problem = Problem()
+    delivery, pickup = plan
+
+    # Deliveries are carried from the DEPOT up to the customer, pickups from
+    # the customer back to the DEPOT.
+    feasible = prefix_max + delivery <= problem.veh_capacity
+    feasible &= suffix_max + pickup <= problem.veh_capacity
+
+    travel_times = problem.travel_times
+    start = np.maximum(prev_leave + travel_times[types, prev, customer],
+                       problem.open_time[customer])
+    leave = start + problem.service_time * (delivery + pickup)
+    feasible &= leave <= problem.close_time[customer]
+
+    succ_start = np.maximum(leave + travel_times[types, customer, succ],
+                            problem.open_time[succ])
+    feasible &= succ_start <= succ_latest
+
+    km_costs = problem.km_costs
+    deltas = km_costs[types, prev, customer] \
+        + km_costs[types, customer, succ] \
+        - km_costs[types, prev, succ]
+
+    return feasible, deltas
+
+
+def best_route_insertions(route: Route, customers: np.ndarray
+                          ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes, for each of the passed-in customers, the cheapest feasible
+    insertion into the given route, when each customer is served fully in a
+    single visit. Returns the positions and cost deltas; customers that
+    cannot be inserted feasibly get position -1 and an infinite delta.
+    Vectorised over customers and legs.
+    """
+    problem = Problem()
+    arrays = route.arrays()
+
+    cust = np.asarray(customers, dtype=np.int64)[:, None]
+    prev = arrays.customers[None, :-1]
+    succ = arrays.customers[None, 1:]
+
+    delivery = problem.delivery_demand[cust]
+    pickup = problem.pickup_demand[cust]
+
+    feasible = arrays.load_prefix_max[None, 1:-1] + delivery \
+        <= problem.veh_capacity
+    feasible &= arrays.load_suffix_max[None, 1:-1] + pickup \
+        <= problem.veh_capacity
+
+    travel_times = problem.vehicle_travel_times(route.vehicle_id)
+    start = np.maximum(arrays.leave[None, :-1] + travel_times[prev, cust],
+                       problem.open_time[cust])
+    leave = start + problem.service_time * (delivery + pickup)
+    feasible &= leave <= problem.close_time[cust]
+
+    succ_start = np.maximum(leave + travel_times[cust, succ],
+                            problem.open_time[succ])
+    feasible &= succ_start <= arrays.latest[None, 1:]
+
+    km_costs = problem.vehicle_km_costs(route.vehicle_id)
+    deltas = km_costs[prev, cust] + km_costs[cust, succ] - km_costs[prev, succ]
+    deltas = np.where(feasible, deltas, np.inf)
+
+    best = np.argmin(deltas, axis=1)
+    best_deltas = deltas[np.arange(len(best)), best]
+
+    positions = np.where(np.isfinite(best_deltas), best + 1, -1)
+    return positions, best_deltas
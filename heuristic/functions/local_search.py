@@ -0,0 +1,217 @@
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+from heuristic.classes import Problem, Route
+from heuristic.constants import (LOCAL_SEARCH_CHECKS, MOVE_INDICES_CACHE_SIZE,
+                                 OR_OPT_LENGTHS)
+
+
+def local_search(route: Route) -> Route:
+    """
+    Improves the passed-in route by 2-opt and or-opt moves, until it is
+    locally optimal. Or-opt moves relocate a segment of OR_OPT_LENGTHS
+    consecutive visits; relocating a single visit is the special case of
+    length one. Each round applies the best improving, feasible move.
+
+    The cost deltas of all moves are evaluated at once, over the edge arrays
+    of the route. Moves that create a leg between customers with
+    incompatible time windows are discarded at once as well (see
+    ``Problem.compatible``). Since the schedule of the whole route may
+    change, the remaining moves are then checked in order of improvement,
+    but at most LOCAL_SEARCH_CHECKS per round.
+
+    Returns an improved copy of the route, or the route itself if no
+    improving move exists. O(|route|^2) per round.
+    """
+    problem = Problem()
+
+    km_costs = problem.vehicle_km_costs(route.vehicle_id)
+    customers = np.array(route.customers)
+    plan = route.plan
+    improved = False
+
+    while len(customers) > 3:
+        deltas, orders = _moves(customers, km_costs, problem.compatible)
+
+        candidates = np.argsort(deltas)[:LOCAL_SEARCH_CHECKS]
+        candidates = candidates[deltas[candidates] < -1e-9]
+
+        for idx in candidates:
+            order = orders[idx]
+
+            if _feasible(route, customers[order], plan[order]):
+                customers, plan = customers[order], plan[order]
+                improved = True
+                break
+        else:  # no improving, feasible move is left
+            break
+
+    if not improved:
+        return route
+
+    return Route(customers.tolist(), [route.schedule[0]], [route.load[0]],
+                 plan, route.vehicle_id)
+
+
+def _moves(customers: np.ndarray, km_costs: np.ndarray,
+           compatible: np.ndarray):
+    """
+    Returns the cost deltas of all time window compatible 2-opt and or-opt
+    moves on the passed-in visits, and for each move the resulting order of
+    the visits, as a lazy sequence of index arrays.
+    """
+    prev, succ = customers[:-1], customers[1:]
+
+    # Cumulative costs and incompatibilities of the legs, forward and
+    # reversed, so segment reversals are evaluated in O(1) each.
+    forward = np.concatenate(([0.], np.cumsum(km_costs[prev, succ])))
+    backward = np.concatenate(([0.], np.cumsum(km_costs[succ, prev])))
+    reversed_incompatible = np.concatenate(
+        ([0], np.cumsum(~compatible[succ, prev])))
+
+    two_opt_moves, or_opt_moves = _move_indices(len(customers))
+
+    # 2-opt: reverses the visits at indices first, ..., second.
+    first, second = two_opt_moves
+
+    before, after = customers[first - 1], customers[second + 1]
+    c_first, c_second = customers[first], customers[second]
+
+    two_opt = km_costs[before, c_second] + km_costs[c_first, after] \
+        - km_costs[before, c_first] - km_costs[c_second, after] \
+        + backward[second] - backward[first] \
+        - forward[second] + forward[first]
+
+    two_opt_ok = compatible[before, c_second] & compatible[c_first, after]
+    two_opt_ok &= reversed_incompatible[second] \
+        - reversed_incompatible[first] == 0
+
+    deltas = [two_opt[two_opt_ok]]
+    moves = [("2-opt", first[two_opt_ok], second[two_opt_ok])]
+
+    # Or-opt: moves the visits at indices start, ..., end to between the
+    # visits at indices to and to + 1.
+    for start, end, to in or_opt_moves:
+        before, after = customers[start - 1], customers[end + 1]
+        c_start, c_end = customers[start], customers[end]
+        c_to, c_next = customers[to], customers[to + 1]
+
+        or_opt = km_costs[before, after] + km_costs[c_to, c_start] \
+            + km_costs[c_end, c_next] - km_costs[before, c_start] \
+            - km_costs[c_end, after] - km_costs[c_to, c_next]
+
+        or_opt_ok = compatible[before, after] & compatible[c_to, c_start]
+        or_opt_ok &= compatible[c_end, c_next]
+
+        deltas.append(or_opt[or_opt_ok])
+        moves.append(("or-opt", start[or_opt_ok], end[or_opt_ok],
+                      to[or_opt_ok]))
+
+    return np.concatenate(deltas), _Orders(len(customers), moves)
+
+
+@lru_cache(maxsize=MOVE_INDICES_CACHE_SIZE)
+def _move_indices(size: int):
+    """
+    Returns the visit indices of all 2-opt and or-opt moves on a route with
+    the given number of visits, including both DEPOT visits. These depend
+    only on the size, so are cached for the most recently used sizes.
+    """
+    last = size - 1  # index of the final DEPOT visit
+
+    first, second = np.triu_indices(last, k=1)
+    keep = first >= 1
+    two_opt = (first[keep], second[keep])
+
+    or_opt = []
+
+    for length in OR_OPT_LENGTHS:
+        start, to = np.meshgrid(np.arange(1, last - length + 1),
+                                np.arange(last), indexing="ij")
+        start, to = start.ravel(), to.ravel()
+
+        end = start + length - 1
+        keep = (to < start - 1) | (to > end)
+        or_opt.append((start[keep], end[keep], to[keep]))
+
+    return two_opt, or_opt
+
+
+class _Orders:
+    """
+    Lazily computes the visit order resulting from each move, since only
+    a few of these are ever needed.
+    """
+
+    def __init__(self, size: int, moves: List[tuple]):
+        self._size = size
+        self._moves = moves
+        self._cache = {}
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        if idx not in self._cache:
+            self._cache[idx] = self._order(int(idx))
+
+        return self._cache[idx]
+
+    def _order(self, idx: int) -> np.ndarray:
+        order = np.arange(self._size)
+
+        for kind, *indices in self._moves:
+            if idx >= len(indices[0]):
+                idx -= len(indices[0])
+                continue
+
+            if kind == "2-opt":
+                first, second = (int(arr[idx]) for arr in indices)
+                order[first:second + 1] = order[first:second + 1][::-1]
+                return order
+
+            start, end, to = (int(arr[idx]) for arr in indices)
+            segment = order[start:end + 1]
+            rest = np.delete(order, np.arange(start, end + 1))
+
+            # Index in the remaining visits after which the segment goes.
+            at = to if to < start else to - (end - start + 1)
+            return np.concatenate((rest[:at + 1], segment, rest[at + 1:]))
+
+        raise IndexError(idx)
+
+
+def _feasible(route: Route, customers: np.ndarray, plan: np.ndarray) -> bool:
+    """
+    Tests if visiting the passed-in customers, with the given plan, is
+    feasible for the vehicle, departure time and initial load of the passed-
+    in route. Uses the same computations as Route, so the verdicts agree.
+    """
+    problem = Problem()
+
+    travel_times = problem.vehicle_travel_times(route.vehicle_id)
+    open_time, close_time = problem.open_time, problem.close_time
+    service = (problem.service_time * plan.sum(axis=1)).tolist()
+
+    customers = customers.tolist()
+    delivery, pickup = plan[:, 0].tolist(), plan[:, 1].tolist()
+
+    load = route.load[0]
+
+    for index in range(1, len(customers)):
+        load = load - delivery[index - 1] + pickup[index - 1]
+
+        if load < 0 or load > problem.veh_capacity:
+            return False
+
+    start = route.schedule[0]
+
+    for index in range(1, len(customers)):
+        prev, customer = customers[index - 1], customers[index]
+
+        arrival = start + service[index - 1] + travel_times[prev, customer]
+        start = float(max(arrival, open_time[customer]))
+
+        if start + service[index] > close_time[customer]:
+            return False
+
+    return start <= problem.veh_shift_end[route.shift]
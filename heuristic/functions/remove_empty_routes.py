@@ -0,0 +1,17 @@
+from functools import wraps
+
+
+def remove_empty_routes(operator):
+    """
+    Wrapper function that removes empty routes from the returned solution
+    instance.
+    """
+
+    @wraps(operator)
+    def decorator(state, rnd_state, **kwargs):
+        destroyed = operator(state, rnd_state, **kwargs)
+        destroyed.remove_empty_routes()
+
+        return destroyed
+
+    return decorator
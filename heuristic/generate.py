@@ -0,0 +1,142 @@
+import argparse
+from types import SimpleNamespace
+
+import numpy as np
+from numpy.random import default_rng
+
+from heuristic.classes import Problem
+from heuristic.classes.Problem import BINARY_EXTENSION
+
+SHIFT_START = [0, 76.667, 153.33]
+SHIFT_END = [76.6669, 153.3299, 230]
+SHIFT_COST = [1500, 2000, 2500]
+
+TOUR_NUM = 3
+TOUR_COST = [500, 1, 1]
+
+VEH_CAPACITY = 100
+VEH_SPEEDS = [55, 45, 65, 50]
+VEH_KM_COSTS = [0.5, 0.4, 0.6, 0.45]
+
+SERVICE_TIME = 0.14
+
+
+def generate(num_customers: int, seed: int, num_vehicles: int = None,
+             num_types: int = 2) -> SimpleNamespace:
+    """
+    Generates a random instance, with the same fields and scales as the
+    instance data modules. Customers are placed uniformly around a central
+    DEPOT, and have time windows between 15 and 40 time units wide. By
+    default there is one vehicle per 15 customers, of num_types different
+    types (speed and km cost).
+
+    Note that the travel-time and km-cost tables take 16 * num_types * n^2
+    bytes; keep num_types small for large instances.
+    """
+    rnd_state = default_rng(seed)
+
+    if num_vehicles is None:
+        num_vehicles = max(2, -(-num_customers // 15))
+
+    coords = rnd_state.uniform(0, 50, size=(num_customers + 1, 2))
+    coords[0] = 25  # the DEPOT
+
+    distances = _distances(coords)
+
+    types = rnd_state.integers(num_types, size=num_vehicles)
+    types[:num_types] = np.arange(num_types)[:num_vehicles]
+
+    width = rnd_state.uniform(15, 40, size=num_customers)
+    open_time = rnd_state.uniform(0, SHIFT_END[-1] - width)
+
+    return SimpleNamespace(
+        INSTANCE_INDEX=seed,
+        VEH_NUM=num_vehicles,
+        VEH_CAPACITY=VEH_CAPACITY,
+        VEH_SPEED=[VEH_SPEEDS[idx] for idx in types],
+        VEH_KM_COST=[VEH_KM_COSTS[idx] for idx in types],
+        VEH_TOUR_NUM=TOUR_NUM,
+        VEH_TOUR_COST=[TOUR_COST] * num_vehicles,
+        VEH_SHIFT_NUM=len(SHIFT_START),
+        VEH_SHIFT_START=SHIFT_START,
+        VEH_SHIFT_END=SHIFT_END,
+        VEH_SHIFT_COST=[SHIFT_COST] * num_vehicles,
+        CUST_NUM=num_customers,
+        CUST_OPEN_TIME=np.round(open_time, 1).tolist(),
+        CUST_CLOSE_TIME=np.round(open_time + width, 1).tolist(),
+        SERVICE_TIME=SERVICE_TIME,
+        CUST_PICKUP_DEMAND=rnd_state.integers(1, 41, num_customers).tolist(),
+        CUST_DELIVERY_DEMAND=rnd_state.integers(1, 41, num_customers).tolist(),
+        CUST_DISTANCES=distances)
+
+
+def _distances(coords: np.ndarray, block_size: int = 1024) -> np.ndarray:
+    """
+    Returns the Euclidean distances between the passed-in coordinates, rounded
+    to two decimals. These are computed in blocks of rows, to bound the memory
+    used for temporaries.
+    """
+    num_nodes = len(coords)
+    x, y = coords[:, 0], coords[:, 1]
+
+    distances = np.empty((num_nodes, num_nodes))
+
+    for start in range(0, num_nodes, block_size):
+        rows = slice(start, min(start + block_size, num_nodes))
+
+        dx = x[rows, None] - x[None, :]
+        dy = y[rows, None] - y[None, :]
+
+        block = distances[rows]
+        np.sqrt(dx * dx + dy * dy, out=block)
+        np.round(block, 2, out=block)
+
+    return distances
+
+
+def write_module(data: SimpleNamespace, location: str):
+    """
+    Writes the passed-in instance data as an instance data module. The
+    distance matrix is written one row per line.
+    """
+    with open(location, 'w') as file:
+        for field, value in vars(data).items():
+            if field == "CUST_DISTANCES":
+                continue
+
+            print(f"{field} = {value!r}", file=file)
+
+        print("CUST_DISTANCES = [", file=file)
+
+        for row in data.CUST_DISTANCES:
+            print("    " + ", ".join(map(repr, row.tolist())) + ",",
+                  file=file)
+
+        print("]", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="heuristic.generate",
+        description="Generates a random instance, as a data module or, for "
+                    f"locations ending in {BINARY_EXTENSION}, as a binary "
+                    "instance file.")
+
+    parser.add_argument("num_customers", type=int)
+    parser.add_argument("location", help="output location.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--vehicles", type=int, help="number of vehicles.")
+    parser.add_argument("--types", type=int, default=2,
+                        help="number of vehicle types.")
+
+    args = parser.parse_args()
+    data = generate(args.num_customers, args.seed, args.vehicles, args.types)
+
+    if args.location.endswith(BINARY_EXTENSION):
+        Problem.from_data(data).to_binary(args.location)
+    else:
+        write_module(data, args.location)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.random import SeedSequence, default_rng
+
+from heuristic.acceptance import BudgetedAnnealing
+from heuristic.classes import Problem, Solution
+from heuristic.constants import (ACCEPT_PROB, DECAY, ITERATIONS,
+                                 SEGMENT_LENGTH, WEIGHTS, WORSE)
+from heuristic.destroy_operators import D_OPERATORS
+from heuristic.repair_operators import R_OPERATORS
+from heuristic.selection import RuntimeAwareRouletteWheel
+from heuristic.solve import Incumbent, initial_solution, solve
+
+
+def solve_parallel(location: str, workers: int, iterations: Optional[int],
+                   exchange_interval: int, seed: Optional[int] = None,
+                   max_runtime: Optional[float] = None,
+                   max_stagnation: Optional[int] = None,
+                   on_best: Optional[Callable[[Incumbent], None]] = None,
+                   initial: Optional[Solution] = None,
+                   segment_length: int = SEGMENT_LENGTH,
+                   decay: float = DECAY) -> Tuple[Solution, List[Dict]]:
+    """
+    Runs independent ALNS searches in a pool of worker processes, each with
+    its own random stream derived from the seed. The problem data is shared
+    with the workers through shared memory. The searches run in epochs
+    of exchange_interval iterations. After each epoch, the workers' best
+    solutions are gathered in compact form, and every worker continues from
+    the overall best. Each worker keeps its simulated annealing temperature
+    and operator weights between epochs, and cools down over its whole
+    budget, so only its current solution is replaced.
+
+    The search stops after the given number of iterations per worker, or
+    runtime in seconds, or number of iterations without a new overall best,
+    whichever comes first; see also ``stopping_criterion``. The on_best
+    callback is called with each new overall best, after its epoch. The
+    search starts from the initial solution when given, for example from a
+    checkpoint, and from ``initial_solution`` otherwise. The operator weights
+    are updated every segment_length iterations, with the given decay.
+
+    Returns the overall best solution, and statistics for each worker.
+    """
+    start = time.perf_counter()
+
+    if iterations is None and max_runtime is None and max_stagnation is None:
+        iterations = ITERATIONS
+
+    problem = Problem.from_file(location)
+    seed = problem.instance if seed is None else seed
+
+    root = SeedSequence(seed)
+    streams = root.spawn(workers)
+
+    best = initial_solution(default_rng(root.spawn(1)[0])) \
+        if initial is None else initial
+
+    if on_best is not None:
+        on_best(Incumbent(best, best.objective(),
+                          time.perf_counter() - start))
+
+    stats = [dict(worker=worker, iterations=0, runtime=0., improvements=0,
+                  best_objective=best.objective())
+             for worker in range(workers)]
+
+    descriptor = problem.to_shared_memory()
+
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(descriptor,)) as pool:
+            best, stats = _run_epochs(pool, streams, best, stats, start,
+                                      iterations, exchange_interval,
+                                      max_runtime, max_stagnation, on_best,
+                                      segment_length, decay)
+    finally:
+        problem.release_shared_memory()
+
+    return best, stats
+
+
+def _run_epochs(pool: ProcessPoolExecutor, streams: List[SeedSequence],
+                best: Solution, stats: List[Dict], start: float,
+                iterations: Optional[int], exchange_interval: int,
+                max_runtime: Optional[float], max_stagnation: Optional[int],
+                on_best: Optional[Callable[[Incumbent], None]],
+                segment_length: int, decay: float
+                ) -> Tuple[Solution, List[Dict]]:
+    """
+    Runs the search epochs, exchanging the overall best solution between
+    the workers after each epoch, until any of the budgets is spent.
+    """
+    compact = best.to_compact()
+
+    accepts = [BudgetedAnnealing.autofit(best.objective(), WORSE, ACCEPT_PROB,
+                                         iterations, max_runtime)
+               for _ in streams]
+    selects = [RuntimeAwareRouletteWheel(WEIGHTS, decay, segment_length,
+                                         len(D_OPERATORS), len(R_OPERATORS))
+               for _ in streams]
+
+    done = 0
+    stagnant = 0  # iterations since the last new overall best
+
+    while iterations is None or done < iterations:
+        remaining = None
+
+        if max_runtime is not None:
+            remaining = max_runtime - (time.perf_counter() - start)
+
+            if remaining <= 0:
+                break
+
+        if max_stagnation is not None and stagnant >= max_stagnation:
+            break
+
+        epoch = exchange_interval if iterations is None \
+            else min(exchange_interval, iterations - done)
+
+        spent = time.perf_counter() - start
+        futures = [pool.submit(_search, compact, stream.spawn(1)[0], epoch,
+                               remaining, accept, select, spent)
+                   for stream, accept, select
+                   in zip(streams, accepts, selects)]
+
+        improved = False
+        epoch_done = 0
+
+        for worker, future in enumerate(futures):
+            result, objective, num_iterations, runtime, \
+                accepts[worker], selects[worker] = future.result()
+
+            stats[worker]["iterations"] += num_iterations
+            stats[worker]["runtime"] += runtime
+            epoch_done = max(epoch_done, num_iterations)
+
+            if objective < stats[worker]["best_objective"]:
+                stats[worker]["best_objective"] = objective
+
+            if objective < best.objective():
+                stats[worker]["improvements"] += 1
+                best = Solution.from_compact(result)
+                improved = True
+
+        done += epoch_done
+        stagnant = 0 if improved else stagnant + epoch_done
+        compact = best.to_compact()
+
+        if improved and on_best is not None:
+            on_best(Incumbent(best, best.objective(),
+                              time.perf_counter() - start))
+
+        if epoch_done == 0:  # out of time before any iteration was done
+            break
+
+    return best, stats
+
+
+def _init_worker(descriptor: Dict):
+    Problem.from_shared_memory(descriptor)
+
+
+def _search(compact: Dict[str, np.ndarray], seed: SeedSequence,
+            iterations: int, max_runtime: Optional[float],
+            accept: BudgetedAnnealing, select: RuntimeAwareRouletteWheel,
+            spent: float):
+    """
+    Runs a single epoch of the search in a worker, starting from the passed-in
+    compact solution, with the acceptance criterion and selection scheme of
+    the worker's previous epoch. Spent is the runtime of the search so far.
+
+    Returns the best solution found in compact form, its objective, the
+    number of iterations done, the runtime, and the updated acceptance
+    criterion and selection scheme.
+    """
+    start = time.perf_counter()
+
+    accept.resume(spent)
+
+    initial = Solution.from_compact(compact)
+    result = solve(initial, default_rng(seed), iterations, max_runtime,
+                   accept=accept, select=select)
+
+    best = result.best_state
+    num_iterations = len(result.statistics.objectives) - 1
+
+    return (best.to_compact(), best.objective(), num_iterations,
+            time.perf_counter() - start, accept, select)
@@ -0,0 +1,192 @@
+import json
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Dict, List, Optional, TextIO
+
+from heuristic.classes import Route, Solution
+from heuristic.classes.Singleton import Singleton
+from heuristic.destroy_operators import D_OPERATORS
+from heuristic.repair_operators import R_OPERATORS
+
+# Methods that are counted and timed while profiling is enabled.
+_METHODS = [
+    (Route, "can_insert"),
+    (Route, "insertion_feasible"),
+    (Route, "insert_customer"),
+    (Route, "remove_at"),
+    (Solution, "__copy__"),
+    (Solution, "__deepcopy__"),
+    (Solution, "begin"),
+    (Solution, "rollback"),
+    (Solution, "objective"),
+]
+
+OUTCOMES = ["best", "better", "accept", "reject"]
+
+
+class Profiler(metaclass=Singleton):
+    """
+    Opt-in instrumentation of the hot paths: operators, feasibility checks,
+    copies and objective evaluations are counted and timed, as is each ALNS
+    iteration.
+
+    Instrumentation works by wrapping the instrumented methods and operators
+    when profiling is enabled, and restoring the originals when it is
+    disabled. When disabled there is thus no overhead at all.
+    """
+    _enabled: bool
+    _originals: Dict
+    _calls: Dict[str, int]
+    _times: Dict[str, float]
+
+    _trace: Optional[TextIO]
+    _iteration: int
+    _last_time: float
+    _last_calls: Dict[str, int]
+    _operators: List[str]  # operators applied in the current iteration
+
+    def __init__(self):
+        self._enabled = False
+        self._originals = {}
+        self._trace = None
+
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def reset(self):
+        self._calls = defaultdict(int)
+        self._times = defaultdict(float)
+
+        self._iteration = 0
+        self._last_time = time.perf_counter()
+        self._last_calls = {}
+        self._operators = []
+
+    def enable(self, trace: Optional[str] = None):
+        """
+        Enables profiling. When a trace location is passed, a JSON line with
+        the wall time, outcome, operators and call counts of each iteration
+        is written to it.
+        """
+        if self._enabled:
+            return
+
+        for owner, name in _METHODS:
+            method = getattr(owner, name)
+            label = f"{owner.__name__}.{name}"
+
+            self._originals[owner, name] = method
+            setattr(owner, name, self._wrap(method, label))
+
+        for operators in (D_OPERATORS, R_OPERATORS):
+            self._originals[id(operators)] = operators[:]
+            operators[:] = [self._wrap(op, op.__name__, True)
+                            for op in operators]
+
+        if trace is not None:
+            self._trace = open(trace, 'w')
+
+        self._enabled = True
+        self.reset()
+
+    def disable(self):
+        """
+        Disables profiling, and restores the uninstrumented methods. The
+        collected statistics are kept until the next reset.
+        """
+        if not self._enabled:
+            return
+
+        for owner, name in _METHODS:
+            setattr(owner, name, self._originals.pop((owner, name)))
+
+        for operators in (D_OPERATORS, R_OPERATORS):
+            operators[:] = self._originals.pop(id(operators))
+
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+        self._enabled = False
+
+    def callbacks(self) -> Dict[str, Callable]:
+        """
+        Returns a callback for each ALNS outcome, recording each iteration.
+        These should be registered on the ALNS instance (see ``make_alns``).
+        """
+        self._last_time = time.perf_counter()
+
+        return {outcome: self._on_iteration(outcome) for outcome in OUTCOMES}
+
+    def summary(self) -> str:
+        """
+        Returns a table of the calls, total and mean time of everything that
+        was timed, sorted by decreasing total time.
+        """
+        lines = [f"{'':<28}{'calls':>10}{'total (s)':>12}{'mean (ms)':>12}"]
+
+        for label in sorted(self._times, key=self._times.get, reverse=True):
+            calls = self._calls[label]
+            total = self._times[label]
+
+            lines.append(f"{label:<28}{calls:>10}{total:>12.3f}"
+                         f"{1000 * total / calls:>12.4f}")
+
+        return "\n".join(lines)
+
+    def _wrap(self, func, label: str, is_operator: bool = False):
+        # The statistics are replaced on reset, so they are looked up on the
+        # profiler at call time, rather than bound here.
+        profiler = self
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler._calls[label] += 1
+                profiler._times[label] += time.perf_counter() - start
+
+                if is_operator:
+                    profiler._operators.append(label)
+
+        return wrapper
+
+    def _on_iteration(self, outcome: str):
+        def callback(candidate: Solution, rnd_state, **kwargs):
+            now = time.perf_counter()
+
+            self._iteration += 1
+            self._calls["iteration"] += 1
+            self._times["iteration"] += now - self._last_time
+
+            if self._trace is not None:
+                calls = {label: count - self._last_calls.get(label, 0)
+                         for label, count in self._calls.items()
+                         if count != self._last_calls.get(label, 0)}
+
+                # The uninstrumented objective, so the trace does not count
+                # its own calls.
+                objective = self._originals[Solution, "objective"](candidate)
+
+                record = dict(iteration=self._iteration,
+                              wall_time=now - self._last_time,
+                              outcome=outcome,
+                              objective=objective,
+                              operators=self._operators,
+                              calls=calls)
+
+                self._trace.write(json.dumps(record) + "\n")
+                self._last_calls = dict(self._calls)
+
+            self._operators = []
+            self._last_time = time.perf_counter()
+
+        callback.__name__ = f"profile_{outcome}"
+        return callback
@@ -3,8 +3,17 @@ from typing import Callable, List
 from numpy.random import RandomState
 
 from heuristic.classes import Solution
+from .granular_insert import granular_insert
 from .greedy_insert import greedy_insert
+from .near_best_insert import near_best_insert
+from .random_insert import random_insert
+from .regret_insert import regret_2_insert, regret_3_insert
 
 R_OPERATORS: List[Callable[[Solution, RandomState], Solution]] = [
     greedy_insert,
+    granular_insert,
+    near_best_insert,
+    random_insert,
+    regret_2_insert,
+    regret_3_insert,
 ]
@@ -0,0 +1,47 @@
+from typing import Optional
+
+from numpy.random import Generator
+
+from heuristic.classes import Solution
+from heuristic.functions import full_plan, insertion_costs
+
+
+def _near_best_insert(num_best: Optional[int], current: Solution,
+                      rnd_state: Generator,
+                      granular: bool = False) -> Solution:
+    """
+    Sequentially inserts a random permutation of the unassigned customers.
+    Each customer is inserted at a position drawn uniformly from its
+    num_best cheapest feasible insertions, over all routes. When num_best is
+    None, all feasible insertions are considered. Customers that cannot be
+    inserted feasibly remain unassigned.
+
+    In granular mode, only insertions next to each customer's nearest
+    neighbours are considered (see ``insertion_costs``).
+    """
+    unassigned = rnd_state.permutation(current.unassigned.to_array())
+
+    current.unassigned.clear()
+    current.add_empty_routes()
+
+    for customer in unassigned:
+        customer = int(customer)
+        plan = full_plan(customer)
+
+        routes, positions, _ = insertion_costs(current, customer, plan,
+                                                granular)
+
+        if len(routes) == 0:
+            current.unassigned.append(customer)
+            continue
+
+        num_candidates = len(routes) if num_best is None \
+            else min(num_best, len(routes))
+        idx = rnd_state.integers(num_candidates)
+
+        current.insert_customer(customer, int(routes[idx]),
+                                int(positions[idx]), plan)
+
+    current.remove_empty_routes()
+
+    return current
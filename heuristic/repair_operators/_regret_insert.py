@@ -0,0 +1,71 @@
+import numpy as np
+from numpy.random import Generator
+
+from heuristic.classes import Solution
+from heuristic.functions import best_route_insertions, full_plan
+
+
+def _regret_insert(k: int, current: Solution,
+                   rnd_state: Generator) -> Solution:
+    """
+    Regret-k insertion. Repeatedly inserts the unassigned customer with the
+    largest regret: the summed difference between its best insertion cost,
+    and its best insertion costs in the next k - 1 best routes. Customers
+    that fit in fewer routes are preferred; ties are broken by the best
+    insertion cost.
+
+    The best insertion cost of each customer in each route is kept in a
+    customer x route matrix. After an insertion only the column of the
+    changed route is recomputed.
+    """
+    # The permutation only serves to randomise ties.
+    customers = rnd_state.permutation(current.unassigned.to_array())
+
+    current.unassigned.clear()
+    current.add_empty_routes()
+
+    num_routes = len(current.routes)
+    costs = np.empty((len(customers), num_routes))
+    positions = np.empty((len(customers), num_routes), dtype=np.int64)
+
+    for idx_route, route in enumerate(current.routes):
+        positions[:, idx_route], costs[:, idx_route] \
+            = best_route_insertions(route, customers)
+
+    while len(customers) != 0:
+        best_costs = np.sort(costs, axis=1)
+        best = best_costs[:, 0]
+
+        if not np.isfinite(best).any():
+            break
+
+        # Infinite costs are replaced by a large cost, so customers that fit
+        # in few routes have a large regret.
+        finite = np.isfinite(best_costs)
+        big_m = 2 * np.abs(best_costs[finite]).max() + 1
+        best_costs = np.where(finite, best_costs, big_m)
+
+        regrets = (best_costs[:, 1:k] - best_costs[:, :1]).sum(axis=1)
+        regrets[~np.isfinite(best)] = -np.inf
+
+        # lexsort sorts by its last key first.
+        idx_cust = np.lexsort((best, -regrets))[0]
+        idx_route = int(np.argmin(costs[idx_cust]))
+
+        customer = int(customers[idx_cust])
+        current.insert_customer(customer, idx_route,
+                                int(positions[idx_cust, idx_route]),
+                                full_plan(customer))
+
+        customers = np.delete(customers, idx_cust)
+        costs = np.delete(costs, idx_cust, axis=0)
+        positions = np.delete(positions, idx_cust, axis=0)
+
+        route = current.routes[idx_route]
+        positions[:, idx_route], costs[:, idx_route] \
+            = best_route_insertions(route, customers)
+
+    current.unassigned.extend(customers)
+    current.remove_empty_routes()
+
+    return current
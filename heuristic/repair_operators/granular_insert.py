@@ -0,0 +1,15 @@
+from numpy.random import Generator
+
+from heuristic.classes import Solution
+from heuristic.functions import improve_routes
+from ._near_best_insert import _near_best_insert
+
+
+@improve_routes
+def granular_insert(current: Solution, rnd_state: Generator) -> Solution:
+    """
+    Sequentially inserts a random permutation of the unassigned customers at
+    their best, feasible position next to one of their nearest neighbours.
+    This evaluates O(k) rather than O(n) insertions per customer.
+    """
+    return _near_best_insert(1, current, rnd_state, granular=True)
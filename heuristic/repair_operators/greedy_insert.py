@@ -1,9 +1,11 @@
 from numpy.random import Generator
 
 from heuristic.classes import Solution
+from heuristic.functions import improve_routes
 from ._near_best_insert import _near_best_insert
 
 
+@improve_routes
 def greedy_insert(current: Solution, rnd_state: Generator) -> Solution:
     """
     Sequentially inserts each a random permutation of the unassigned customers
@@ -0,0 +1,15 @@
+from numpy.random import Generator
+
+from heuristic.classes import Solution
+from heuristic.functions import improve_routes
+from ._near_best_insert import _near_best_insert
+
+
+@improve_routes
+def near_best_insert(current: Solution, rnd_state: Generator) -> Solution:
+    """
+    Sequentially inserts a random permutation of the unassigned customers
+    into one of their three best, feasible insertion positions, chosen
+    uniformly at random.
+    """
+    return _near_best_insert(3, current, rnd_state)
@@ -0,0 +1,14 @@
+from numpy.random import Generator
+
+from heuristic.classes import Solution
+from heuristic.functions import improve_routes
+from ._near_best_insert import _near_best_insert
+
+
+@improve_routes
+def random_insert(current: Solution, rnd_state: Generator) -> Solution:
+    """
+    Sequentially inserts a random permutation of the unassigned customers
+    into a feasible insertion position, chosen uniformly at random.
+    """
+    return _near_best_insert(None, current, rnd_state)
@@ -0,0 +1,23 @@
+from numpy.random import Generator
+
+from heuristic.classes import Solution
+from heuristic.functions import improve_routes
+from ._regret_insert import _regret_insert
+
+
+@improve_routes
+def regret_2_insert(current: Solution, rnd_state: Generator) -> Solution:
+    """
+    Inserts the unassigned customers in order of their regret-2 value: the
+    difference between their best, and second-best route insertion costs.
+    """
+    return _regret_insert(2, current, rnd_state)
+
+
+@improve_routes
+def regret_3_insert(current: Solution, rnd_state: Generator) -> Solution:
+    """
+    Inserts the unassigned customers in order of their regret-3 value, which
+    also accounts for their third-best route insertion cost.
+    """
+    return _regret_insert(3, current, rnd_state)
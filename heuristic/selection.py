@@ -0,0 +1,138 @@
+import json
+import time
+from functools import wraps
+from typing import Callable, List, Optional, TextIO
+
+import numpy as np
+from alns.select import RouletteWheel, SegmentedRouletteWheel
+
+# Lower bound on the operator weights, so every operator remains selectable.
+MIN_WEIGHT = 1e-6
+
+
+class RuntimeAwareRouletteWheel(SegmentedRouletteWheel):
+    """
+    Segmented roulette wheel that rewards operators for improvement per
+    second, rather than per iteration. The wall time of each operator is
+    measured, for which the operators must be wrapped by ``timed``.
+
+    At the end of each segment, the weight of each operator that was used
+    in the segment is updated with its summed scores, divided by its
+    summed wall time. This is scaled by the mean wall time per call, over
+    all operators of its kind, so weights remain comparable with the
+    scores. An operator that is ten times slower than average thus needs
+    ten times the scores to keep its weight.
+
+    When a log is passed, the weights, wall times and calls of each
+    operator are written to it at the end of each segment, as JSON lines.
+    """
+    _d_names: List[str]
+    _r_names: List[str]
+
+    _log: Optional[TextIO]
+
+    def __init__(self, scores: List[float], decay: float, seg_length: int,
+                 num_destroy: int, num_repair: int,
+                 op_coupling: Optional[np.ndarray] = None,
+                 log: Optional[TextIO] = None):
+        super().__init__(scores, decay, seg_length, num_destroy, num_repair,
+                         op_coupling)
+
+        self._d_names = [str(idx) for idx in range(num_destroy)]
+        self._r_names = [str(idx) for idx in range(num_repair)]
+
+        self._log = log
+
+    def timed(self, operator: Callable, is_destroy: bool,
+              idx: int) -> Callable:
+        """
+        Returns a wrapper of the passed-in destroy or repair operator, at the
+        given index, that measures its wall time for this scheme.
+        """
+        names = self._d_names if is_destroy else self._r_names
+        names[idx] = operator.__name__
+
+        # The segment arrays are replaced at the end of each segment, so
+        # these are looked up at call time, rather than bound here.
+        scheme = self
+
+        @wraps(operator)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+
+            try:
+                return operator(*args, **kwargs)
+            finally:
+                times = scheme._d_seg_times if is_destroy \
+                    else scheme._r_seg_times
+                times[idx] += time.perf_counter() - start
+
+        return wrapper
+
+    def __call__(self, rng, best, curr):
+        self._iter += 1
+
+        if self._iter % self._seg_length == 0:
+            self._end_segment()
+
+        return RouletteWheel.__call__(self, rng, best, curr)
+
+    def update(self, cand, d_idx, r_idx, outcome):
+        super().update(cand, d_idx, r_idx, outcome)
+
+        self._d_seg_calls[d_idx] += 1
+        self._r_seg_calls[r_idx] += 1
+
+    def _end_segment(self):
+        self._d_weights = self._updated(self._d_weights, self._d_seg_weights,
+                                        self._d_seg_times, self._d_seg_calls)
+        self._r_weights = self._updated(self._r_weights, self._r_seg_weights,
+                                        self._r_seg_times, self._r_seg_calls)
+
+        if self._log is not None:
+            record = dict(iteration=self._iter,
+                          destroy=self._record(self._d_names,
+                                               self._d_weights,
+                                               self._d_seg_times,
+                                               self._d_seg_calls),
+                          repair=self._record(self._r_names,
+                                              self._r_weights,
+                                              self._r_seg_times,
+                                              self._r_seg_calls))
+
+            self._log.write(json.dumps(record) + "\n")
+            self._log.flush()
+
+        self._reset_segment_weights()
+
+    def _updated(self, weights: np.ndarray, scores: np.ndarray,
+                 times: np.ndarray, calls: np.ndarray) -> np.ndarray:
+        used = calls > 0
+
+        if not used.any():
+            return weights
+
+        mean_time = times[used].sum() / calls[used].sum()
+        rates = scores[used] / np.maximum(times[used], 1e-9) * mean_time
+
+        weights = weights.copy()
+        weights[used] = self._decay * weights[used] + (1 - self._decay) * rates
+
+        return np.maximum(weights, MIN_WEIGHT)
+
+    @staticmethod
+    def _record(names: List[str], weights: np.ndarray, times: np.ndarray,
+                calls: np.ndarray) -> dict:
+        return {name: dict(weight=float(weight), time=float(time_),
+                           calls=int(num_calls))
+                for name, weight, time_, num_calls
+                in zip(names, weights, times, calls)}
+
+    def _reset_segment_weights(self):
+        super()._reset_segment_weights()
+
+        self._d_seg_times = np.zeros_like(self._d_weights)
+        self._r_seg_times = np.zeros_like(self._r_weights)
+
+        self._d_seg_calls = np.zeros(len(self._d_weights), dtype=np.int64)
+        self._r_seg_calls = np.zeros(len(self._r_weights), dtype=np.int64)
@@ -0,0 +1,194 @@
+import time
+from typing import Callable, List, NamedTuple, Optional, TextIO
+
+from alns import ALNS, Result
+from alns.stop import (MaxIterations, MaxRuntime, NoImprovement,
+                       StoppingCriterion)
+from numpy.random import Generator
+
+from heuristic.acceptance import BudgetedAnnealing
+from heuristic.classes import Solution
+from heuristic.constants import (ACCEPT_PROB, DECAY, ITERATIONS,
+                                 SEGMENT_LENGTH, WEIGHTS, WORSE)
+from heuristic.construction import nearest_neighbour
+from heuristic.destroy_operators import D_OPERATORS
+from heuristic.profiling import OUTCOMES, Profiler
+from heuristic.repair_operators import R_OPERATORS, greedy_insert
+from heuristic.selection import RuntimeAwareRouletteWheel
+
+
+def initial_solution(rnd_state: Generator) -> Solution:
+    """
+    Returns an initial solution, constructed by the nearest neighbour
+    heuristic. Customers it leaves unassigned are then greedily inserted.
+    """
+    solution = nearest_neighbour()
+
+    if solution.unassigned:
+        solution = greedy_insert(solution, rnd_state)
+
+    return solution
+
+
+class Incumbent(NamedTuple):
+    """
+    A new best solution, as streamed while solving.
+    """
+    solution: Solution
+    objective: float
+    runtime: float  # seconds since the search started
+
+
+def make_alns(rnd_state: Generator,
+              on_best: Optional[Callable[[Solution], None]] = None,
+              select: Optional[RuntimeAwareRouletteWheel] = None) -> ALNS:
+    """
+    Returns an ALNS instance with all destroy and repair operators
+    registered. When profiling is enabled, the profiler is attached to it.
+    The optional on_best callback is called with each new best solution.
+    When a runtime-aware selection scheme is passed, the operators are
+    timed for it.
+    """
+    alns = ALNS(rnd_state)
+
+    for idx, op in enumerate(D_OPERATORS):
+        alns.add_destroy_operator(op if select is None
+                                  else select.timed(op, True, idx))
+
+    for idx, op in enumerate(R_OPERATORS):
+        alns.add_repair_operator(op if select is None
+                                 else select.timed(op, False, idx))
+
+    callbacks = {outcome: [_end_transaction(outcome)] for outcome in OUTCOMES}
+
+    profiler = Profiler()
+
+    if profiler.enabled:
+        for outcome, callback in profiler.callbacks().items():
+            callbacks[outcome].insert(0, callback)
+
+    if on_best is not None:
+        # After the transaction callback, so the new best is frozen, and
+        # may be kept by the callback.
+        callbacks["best"].append(lambda cand, rnd_state, **kwargs:
+                                 on_best(cand))
+
+    # ALNS holds a single callback per outcome, so these are chained.
+    for outcome in OUTCOMES:
+        register = getattr(alns, f"on_{outcome}")
+        register(_chain(callbacks[outcome]))
+
+    return alns
+
+
+def _end_transaction(outcome: str) -> Callable:
+    """
+    Returns a callback that ends the candidate's transaction (see
+    ``Solution.begin``). Rejected candidates are rolled back, and all others
+    are committed. New best solutions are frozen, since ALNS stores them.
+    """
+    def callback(candidate: Solution, rnd_state, **kwargs):
+        if outcome == "reject":
+            candidate.rollback()
+            return
+
+        candidate.commit()
+
+        if outcome == "best":
+            candidate.freeze()
+
+    return callback
+
+
+def _chain(callbacks: List[Callable]) -> Callable:
+    def callback(candidate: Solution, rnd_state, **kwargs):
+        for func in callbacks:
+            func(candidate, rnd_state, **kwargs)
+
+    return callback
+
+
+def stopping_criterion(iterations: Optional[int] = None,
+                       max_runtime: Optional[float] = None,
+                       max_stagnation: Optional[int] = None
+                       ) -> StoppingCriterion:
+    """
+    Returns a criterion that stops after the given number of iterations, or
+    runtime in seconds, or number of iterations without a new best
+    solution, whichever comes first. Criteria that are None are not used.
+    When none are given, the search stops after ITERATIONS iterations.
+    """
+    criteria = []
+
+    if iterations is not None:
+        criteria.append(MaxIterations(iterations))
+
+    if max_runtime is not None:
+        criteria.append(MaxRuntime(max_runtime))
+
+    if max_stagnation is not None:
+        criteria.append(NoImprovement(max_stagnation))
+
+    if not criteria:
+        criteria.append(MaxIterations(ITERATIONS))
+
+    def stop(rnd_state, best, current) -> bool:
+        # All criteria are evaluated, since some count their calls.
+        return any([criterion(rnd_state, best, current)
+                    for criterion in criteria])
+
+    return stop
+
+
+def solve(initial: Solution, rnd_state: Generator,
+          iterations: Optional[int] = None,
+          max_runtime: Optional[float] = None,
+          max_stagnation: Optional[int] = None,
+          on_best: Optional[Callable[[Incumbent], None]] = None,
+          segment_length: int = SEGMENT_LENGTH, decay: float = DECAY,
+          weights_log: Optional[TextIO] = None,
+          accept: Optional[BudgetedAnnealing] = None,
+          select: Optional[RuntimeAwareRouletteWheel] = None) -> Result:
+    """
+    Runs the ALNS from the passed-in initial solution, until the stopping
+    criterion is met (see ``stopping_criterion``). Operators are selected
+    by their improvement per second, with weights that are updated after
+    every segment of iterations (see ``RuntimeAwareRouletteWheel``). The
+    weights are written to the optional weights log. Simulated annealing
+    cools down over the iteration and runtime budgets, whichever is spent
+    first; under a stagnation budget alone, it cools down over ITERATIONS
+    iterations (see ``BudgetedAnnealing``).
+
+    The on_best callback, when given, is called with the initial solution
+    as soon as the search starts, and with each new best solution as it is
+    found. These are never changed by the search, so the best-so-far answer
+    can be used right away.
+
+    A search may continue with the acceptance criterion and selection
+    scheme of an earlier run on the same budget, when these are passed in.
+    Both are updated in place.
+    """
+    start = time.perf_counter()
+
+    def stream(solution: Solution):
+        on_best(Incumbent(solution, solution.objective(),
+                          time.perf_counter() - start))
+
+    if select is None:
+        select = RuntimeAwareRouletteWheel(WEIGHTS, decay, segment_length,
+                                           len(D_OPERATORS), len(R_OPERATORS),
+                                           log=weights_log)
+
+    alns = make_alns(rnd_state, None if on_best is None else stream, select)
+
+    if on_best is not None:
+        stream(initial)
+
+    if accept is None:
+        accept = BudgetedAnnealing.autofit(initial.objective(), WORSE,
+                                           ACCEPT_PROB, iterations,
+                                           max_runtime)
+
+    stop = stopping_criterion(iterations, max_runtime, max_stagnation)
+
+    return alns.iterate(initial, select, accept, stop)